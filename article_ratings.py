@@ -1,17 +1,12 @@
 import logging
 from telegram import Update
 from database import save_rating
-from dotenv import load_dotenv
-load_dotenv()
-# setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+
 logger = logging.getLogger(__name__)
 
 
-async def log_article_rating(update: Update, category: str, article_index: int, rating_type: str):
+async def log_article_rating(update: Update, category: str, article_index: int, rating_type: str,
+                             article_title: str = None):
     """
     log article rating to local database
 
@@ -20,6 +15,7 @@ async def log_article_rating(update: Update, category: str, article_index: int,
         category: article category
         article_index: article index in the faq data
         rating_type: either 'up' for 👍 or 'down' for 👎
+        article_title: article title from the faq snapshot, if known
     """
     try:
         user = update.effective_user
@@ -34,9 +30,9 @@ async def log_article_rating(update: Update, category: str, article_index: int,
         # convert index to string id
         article_id = str(article_index)
 
-        # we'll get the actual title from callback data in the main bot
-        # this is just a placeholder, the actual title will be set in bot.py
-        article_title = f"Article {article_id}"
+        # fall back to a placeholder if the article is gone from the faq snapshot
+        if not article_title:
+            article_title = f"Article {article_id}"
 
         # prepare rating data
         rating_data = {
@@ -45,16 +41,17 @@ async def log_article_rating(update: Update, category: str, article_index: int,
             'category': category,
             'article_id': article_id,
             'article_title': article_title,
-            'rating': rating_value
+            'rating': rating_value,
+            'rating_type': rating_type
         }
 
         # save to local database
         success = save_rating(rating_data)
 
         if success:
-            logger.info(f"added rating '{rating_type}' for article in category '{category}' by user {user.id}")
+            logger.info("added rating '%s' for article in category '%s' by user %s", rating_type, category, user.id)
         else:
-            logger.error(f"failed to save rating for user {user.id}, article {article_id}")
+            logger.error("failed to save rating for user %s, article %s", user.id, article_id)
 
     except Exception as e:
-        logger.error(f"error logging article rating: {e}")
\ No newline at end of file
+        logger.error("error logging article rating: %s", e)
\ No newline at end of file
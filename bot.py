@@ -1,8 +1,13 @@
+# imported first so startup timings include the remaining imports
+from startup import StartupTimer, wait_until_ready, can_connect
 import os
+import html
+import json
+import hashlib
+import signal
 import logging
 import time
 import asyncio
-from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
@@ -12,85 +17,223 @@ from telegram.ext import (
 )
 from user_logger import log_user
 from article_ratings import log_article_rating
-from google_client import get_sheets_client, SPREADSHEET_ID
-from database import init_db
-
-# load environment variables from .env file
-load_dotenv()
-
-# setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+from config import (
+    setup_logging, FAQ_UPDATE_INTERVAL, STARTUP_TIMEOUT, TELEGRAM_API_HOST,
+    PROFILE_MAX_SECONDS, LOOP_LAG_THRESHOLD, UPDATE_CONCURRENCY,
+    RELOAD_TOKEN, RELOAD_HOST, RELOAD_PORT
+)
+from google_client import get_sheets_client
+from tenants import get_tenants, get_current_tenant, bind, run_for_tenant, run_in_sync_pool
+from throttler import get_throttler
+from flood_guard import get_inbound_guard
+from database import (
+    init_db, get_article_stats, get_rating_totals,
+    create_broadcast, get_latest_broadcast, get_running_broadcasts, set_broadcast_status
 )
+from retention import get_archive_stats, run_retention_if_needed, prepare_retention
+from export import export_table, EXPORT_FORMATS
+from broadcast import start_broadcast_task, stop_broadcast_tasks
+from profiling import profiled, get_profiler, LoopWatchdog
+from deep_links import build_link_index, category_payload, article_payload, make_link
+from update_processor import ChatOrderedUpdateProcessor
+from faq_reload import FaqReloader, start_reload_server
+
 logger = logging.getLogger(__name__)
 
 # global variables
-faq_data = {}
-last_update_time = 0
-UPDATE_INTERVAL = int(os.environ.get('FAQ_UPDATE_INTERVAL', '300'))  # refresh faq data every 5 minutes by default
+UPDATE_INTERVAL = FAQ_UPDATE_INTERVAL
+STATS_TOP_ARTICLES = 10
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024  # telegram bot api upload limit
+MAX_MESSAGE_LENGTH = 4096
+DEFAULT_PROFILE_SECONDS = 30
+
+# references to fire-and-forget tasks, so they are not garbage collected while running
+background_tasks = set()
+
+
+# header cells recognised in the first row of a faq tab
+FAQ_HEADERS = ['группа', 'category', 'group']
+EMPTY_SNAPSHOT = {'data': {}, 'links': {}}
+
+
+def user_language(update: Update):
+    """telegram language of the user behind an update, if known"""
+    user = update.effective_user
+    return user.language_code if user else None
+
+
+def get_faq_snapshot(language_code=None):
+    """
+    get the faq snapshot for a telegram language code of the current tenant
+
+    'pt-br' falls back to 'pt', unknown or empty ones to the default language. the
+    snapshots are loaded in the background; until the first load is done every
+    language is empty, and expired ones are still served while a refresh runs.
+    """
+    tenant = get_current_tenant()
+
+    if not tenant.faq_snapshots or time.time() - tenant.faq_updated_at >= UPDATE_INTERVAL:
+        # the sheet is never read on the event loop: until the refresh is done an empty
+        # cache answers "not loaded yet" and an expired one is served as is. outside
+        # a running bot there is no loop to keep free, so it is read right here
+        if not faq_reloader.ensure(tenant):
+            refresh_faq_data()
+
+    snapshots = tenant.faq_snapshots
+    if language_code:
+        snapshot = snapshots.get(language_code) or snapshots.get(language_code.split('-')[0].lower())
+        # an empty or missing tab falls back to the default language
+        if snapshot and snapshot['data']:
+            return snapshot
+    return snapshots.get(tenant.default_language) or EMPTY_SNAPSHOT
+
+
+def get_faq_data(language_code=None):
+    """get the categories with articles for a language, see get_faq_snapshot"""
+    return get_faq_snapshot(language_code)['data']
+
+
+def faq_range(title):
+    """a1 range of the faq columns of a tab, a range without a sheet name reads the first sheet"""
+    if title is None:
+        return 'A:C'
+    return "'" + title.replace("'", "''") + "'!A:C"
+
 
+def parse_faq_rows(rows):
+    """format faq rows (category, title, content) for the bot"""
+    # skip header row if it exists
+    if rows and rows[0] and rows[0][0].lower() in FAQ_HEADERS:
+        rows = rows[1:]
 
-def get_faq_data():
-    """get data from google sheets and format it for the bot"""
-    global faq_data, last_update_time
+    formatted_data = {}
+    for row in rows:
+        # the api leaves out empty cells at the end of a row
+        row = list(row) + [''] * (3 - len(row))
+        category, title, content = row[0], row[1], row[2]
+        if not category and not title:
+            continue
 
-    # check if we need to update
+        if category not in formatted_data:
+            formatted_data[category] = []
+
+        formatted_data[category].append({
+            'title': title,
+            'content': content
+        })
+
+    return formatted_data
+
+
+def refresh_faq_data():
+    """
+    read every language tab of the current tenant in one request and rebuild the snapshots that changed
+
+    tabs missing from the sheet are logged and skipped, the other languages still load.
+
+    returns:
+        False if the sheet could not be read
+    """
+    tenant = get_current_tenant()
     current_time = time.time()
-    if current_time - last_update_time < UPDATE_INTERVAL and faq_data:
-        return faq_data
 
     try:
         # get reusable client
         client = get_sheets_client()
+        spreadsheet = client.open_by_key(tenant.spreadsheet_id)
+
+        # the batch fails as a whole if one range names a missing tab, so only existing tabs
+        # are requested; languages of missing tabs keep their last snapshot, if any
+        titles = {worksheet.title for worksheet in spreadsheet.worksheets()}
+        languages = []
+        for language, title in tenant.faq_languages.items():
+            if title is None or title in titles:
+                languages.append((language, title))
+            else:
+                logger.warning(f"faq tab '{title}' for language '{language}' not found in the sheet of {tenant.name}")
 
-        # open the spreadsheet and get the first sheet
-        sheet = client.open_by_key(SPREADSHEET_ID).sheet1
+        # one request for all tabs, adding a language doesn't add requests
+        response = spreadsheet.values_batch_get([faq_range(title) for _, title in languages]) if languages else {}
+        value_ranges = response.get('valueRanges', [])
 
-        # get all data
-        data = sheet.get_all_values()
+        snapshots = dict(tenant.faq_snapshots)
+        changed = []
+        for (language, _), value_range in zip(languages, value_ranges):
+            rows = value_range.get('values', [])
 
-        # skip header row if it exists
-        if data and len(data) > 0:
-            data = data[1:] if data[0][0].lower() in ['группа', 'category', 'group'] else data
+            # skip parsing and link indexing when the tab is unchanged
+            digest = hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()
+            if tenant.faq_hashes.get(language) == digest and language in snapshots:
+                continue
 
-        # format data for bot
-        formatted_data = {}
-        for row in data:
-            if len(row) >= 3:  # ensure we have 3 columns
-                category, title, content = row[0], row[1], row[2]
+            data = parse_faq_rows(rows)
+            snapshots[language] = {'data': data, 'links': build_link_index(data)}
+            tenant.faq_hashes[language] = digest
+            changed.append(f"{language}: {len(data)} categories")
 
-                if category not in formatted_data:
-                    formatted_data[category] = []
+        # swap in one assignment, handlers never see a half-updated set
+        tenant.faq_snapshots = snapshots
+        tenant.faq_updated_at = current_time
 
-                formatted_data[category].append({
-                    'title': title,
-                    'content': content
-                })
+        if changed:
+            logger.info(f"faq data updated for {tenant.name}. {', '.join(changed)} loaded.")
+        return True
 
-        # update cache
-        faq_data = formatted_data
-        last_update_time = current_time
+    except Exception as e:
+        # existing snapshots stay in use
+        logger.error(f"error fetching faq data for {tenant.name}: {e}")
+        return False
 
-        logger.info(f"faq data updated. {len(formatted_data)} categories loaded.")
-        return formatted_data
 
-    except Exception as e:
-        logger.error(f"error fetching faq data: {e}")
-        # return existing data if available, otherwise empty dict
-        return faq_data if faq_data else {}
+# debounced background faq refresh, started with the event loop
+faq_reloader = FaqReloader(refresh_faq_data)
+
+
+async def guard_update(update: Update):
+    """
+    admission check run by the update processor as soon as an update arrives
+
+    duplicate and excess updates are dropped before they queue behind the
+    chat's earlier updates, so no handler does db or render work for them.
+
+    returns:
+        True if the update should be processed
+    """
+    user = update.effective_user
+    if not user:
+        return True
+
+    query = update.callback_query
+    if query:
+        payload = query.data
+    elif update.message:
+        payload = update.message.text
+    else:
+        payload = None
+
+    if get_inbound_guard().allow((get_current_tenant().name, user.id), payload):
+        return True
+
+    # rejected callbacks still need an answer, otherwise the button keeps spinning
+    if query:
+        try:
+            await get_throttler().answer(query)
+        except Exception as e:
+            logger.debug("failed to answer dropped callback: %s", e)
+
+    return False
 
 
 async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, edit_message=False):
     """show main menu with categories"""
-    data = get_faq_data()
+    data = get_faq_data(user_language(update))
 
     if not data:
         message_text = "Информация пока не загружена. Пожалуйста, попробуйте позже."
         if edit_message and update.callback_query:
-            await update.callback_query.edit_message_text(message_text)
+            await get_throttler().edit(update.callback_query, message_text)
         else:
-            await update.message.reply_text(message_text)
+            await get_throttler().reply(update.message, message_text)
         return
 
     # create keyboard with categories
@@ -102,25 +245,73 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, edi
     message_text = "Выберите категорию вопроса:"
 
     if edit_message and update.callback_query:
-        await update.callback_query.edit_message_text(message_text, reply_markup=reply_markup)
+        await get_throttler().edit(update.callback_query, message_text, reply_markup=reply_markup)
     else:
-        await update.message.reply_text(message_text, reply_markup=reply_markup)
+        await get_throttler().reply(update.message, message_text, reply_markup=reply_markup)
+
+
+def category_view(category, articles):
+    """text and keyboard of a category with its articles"""
+    keyboard = []
+
+    # create article buttons
+    for i, article in enumerate(articles):
+        keyboard.append([InlineKeyboardButton(article['title'], callback_data=f"art_{category}_{i}")])
+
+    # add back button
+    keyboard.append([InlineKeyboardButton("« Назад", callback_data="main_menu")])
+
+    return f"Вопросы в категории '{category}':", InlineKeyboardMarkup(keyboard)
+
+
+def article_view(category, index, article):
+    """text and keyboard of an article with rating buttons"""
+    # navigation and rating buttons
+    keyboard = [
+        # rating buttons
+        [
+            InlineKeyboardButton("👍 Полезно", callback_data=f"rate_up_{category}_{index}"),
+            InlineKeyboardButton("👎 Не полезно", callback_data=f"rate_down_{category}_{index}")
+        ],
+        # back button
+        [InlineKeyboardButton("« Назад к списку", callback_data=f"cat_{category}")]
+    ]
+
+    return f"<b>{article['title']}</b>\n\n{article['content']}", InlineKeyboardMarkup(keyboard)
 
 
+@profiled('start')
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """start command handler"""
+    """start command handler, /start <payload> from a deep link opens the target directly"""
     # log user information when they start dialog
     log_user(update)
 
+    if context.args:
+        snapshot = get_faq_snapshot(user_language(update))
+        data = snapshot['data']
+        category, index = snapshot['links'].get(context.args[0], (None, None))
+
+        # the index may come from a snapshot refreshed in between, check it against the data
+        if category in data and (index is None or index < len(data[category])):
+            if index is None:
+                text, reply_markup = category_view(category, data[category])
+                await get_throttler().reply(update.message, text, reply_markup=reply_markup)
+            else:
+                text, reply_markup = article_view(category, index, data[category][index])
+                await get_throttler().reply(update.message, text, reply_markup=reply_markup, parse_mode='HTML')
+            return
+
+    # no payload, or the target is gone from the faq
     await show_main_menu(update, context)
 
 
+@profiled('button_handler')
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """handle button press"""
     query = update.callback_query
-    await query.answer()
+    await get_throttler().answer(query)
 
-    data = get_faq_data()
+    data = get_faq_data(user_language(update))
     callback_data = query.data
 
     # handle category selection
@@ -128,20 +319,10 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         category = callback_data[4:]  # remove 'cat_' prefix
 
         if category in data:
-            articles = data[category]
-            keyboard = []
-
-            # create article buttons
-            for i, article in enumerate(articles):
-                keyboard.append([InlineKeyboardButton(article['title'], callback_data=f"art_{category}_{i}")])
-
-            # add back button
-            keyboard.append([InlineKeyboardButton("« Назад", callback_data="main_menu")])
-
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(f"Вопросы в категории '{category}':", reply_markup=reply_markup)
+            text, reply_markup = category_view(category, data[category])
+            await get_throttler().edit(query, text, reply_markup=reply_markup)
         else:
-            await query.edit_message_text(f"Категория не найдена. Пожалуйста, вернитесь в главное меню.")
+            await get_throttler().edit(query, f"Категория не найдена. Пожалуйста, вернитесь в главное меню.")
 
     # handle article selection
     elif callback_data.startswith("art_"):
@@ -150,28 +331,11 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             category, index = parts[0], int(parts[1])
 
             if category in data and 0 <= index < len(data[category]):
-                article = data[category][index]
-
-                # navigation and rating buttons
-                keyboard = [
-                    # rating buttons
-                    [
-                        InlineKeyboardButton("👍 Полезно", callback_data=f"rate_up_{category}_{index}"),
-                        InlineKeyboardButton("👎 Не полезно", callback_data=f"rate_down_{category}_{index}")
-                    ],
-                    # back button
-                    [InlineKeyboardButton("« Назад к списку", callback_data=f"cat_{category}")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-
                 # display article
-                await query.edit_message_text(
-                    f"<b>{article['title']}</b>\n\n{article['content']}",
-                    reply_markup=reply_markup,
-                    parse_mode='HTML'
-                )
+                text, reply_markup = article_view(category, index, data[category][index])
+                await get_throttler().edit(query, text, reply_markup=reply_markup, parse_mode='HTML')
             else:
-                await query.edit_message_text("Статья не найдена. Пожалуйста, вернитесь в главное меню.")
+                await get_throttler().edit(query, "Статья не найдена. Пожалуйста, вернитесь в главное меню.")
 
     # handle rating
     elif callback_data.startswith("rate_"):
@@ -181,11 +345,17 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             category = parts[2]
             index = int(parts[3])
 
+            # resolve the real title from the faq snapshot
+            article_title = None
+            if category in data and 0 <= index < len(data[category]):
+                article_title = data[category][index]['title']
+
             # log the rating
-            await log_article_rating(update, category, index, rating_type)
+            await log_article_rating(update, category, index, rating_type, article_title)
 
             # show confirmation and return to article
-            await query.edit_message_text(
+            await get_throttler().edit(
+                query,
                 f"Спасибо за вашу оценку! {'👍' if rating_type == 'up' else '👎'}\n\n"
                 f"Через 2 секунды вы вернетесь к статье...",
                 parse_mode='HTML'
@@ -210,7 +380,8 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 reply_markup = InlineKeyboardMarkup(keyboard)
 
                 # display article again
-                await query.edit_message_text(
+                await get_throttler().edit(
+                    query,
                     f"<b>{article['title']}</b>\n\n{article['content']}",
                     reply_markup=reply_markup,
                     parse_mode='HTML'
@@ -218,7 +389,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # handle "already rated" button - do nothing
     elif callback_data == "rated_already":
-        await query.answer("Вы уже оценили эту статью")
+        await get_throttler().answer(query, "Вы уже оценили эту статью")
 
     # handle main menu navigation
     elif callback_data == "main_menu":
@@ -227,49 +398,400 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """help command handler"""
-    await update.message.reply_text(
+    await get_throttler().reply(
+        update.message,
         "Этот бот предоставляет справочную информацию.\n"
         "Используйте /start для начала работы и навигации по категориям."
     )
 
 
-def main():
-    """start the bot"""
-    # wait a bit for services to start if needed
-    time.sleep(5)
-
-    # create application
-    token = os.environ.get('TELEGRAM_TOKEN')
-    if not token:
-        logger.error("TELEGRAM_TOKEN not set!")
+def is_admin(update: Update):
+    """check if the user is an admin of the current tenant"""
+    user = update.effective_user
+    return user is not None and user.id in get_current_tenant().admin_ids
+
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """admin-only command showing article rating counters"""
+    if not is_admin(update):
         return
 
-    # initialize database
-    init_db()
+    totals = get_rating_totals()
+    top_articles = get_article_stats(limit=STATS_TOP_ARTICLES)
+
+    lines = [
+        "<b>Оценки статей</b>",
+        f"Статей с оценками: {totals['articles']}",
+        f"👍 {totals['up_count']}  👎 {totals['down_count']}",
+    ]
+
+    if top_articles:
+        lines.append("")
+        lines.append(f"<b>Топ-{STATS_TOP_ARTICLES} по числу оценок:</b>")
+        for stat in top_articles:
+            total = stat['up_count'] + stat['down_count']
+            helpful = round(100 * stat['up_count'] / total) if total else 0
+            lines.append(
+                f"{html.escape(stat['category'])} / {html.escape(stat['article_title'] or stat['article_id'])}: "
+                f"👍 {stat['up_count']}  👎 {stat['down_count']} ({helpful}%)"
+            )
 
-    # start application
-    application = Application.builder().token(token).build()
+    # storage footprint of the local database and its archive; counting rows and walking
+    # the archive take time on big installs, so this runs off the event loop
+    archive = await run_in_sync_pool(get_current_tenant(), get_archive_stats)
+    lines.append("")
+    lines.append("<b>Хранилище:</b>")
+    lines.append(
+        f"База: {archive['database']['size_bytes'] // 1024} КБ, "
+        f"пользователей {archive['database']['users_rows']}, оценок {archive['database']['ratings_rows']}"
+    )
+    for table in ('users', 'ratings'):
+        lines.append(
+            f"Архив {table}: {archive[table]['archived_rows']} строк, "
+            f"{archive[table]['files']} файлов, {archive[table]['size_bytes'] // 1024} КБ"
+        )
+
+    # update processing load of this bot
+    processing = context.application.update_processor.get_stats()
+    lines.append("")
+    lines.append(
+        f"Обработка: в работе {processing['in_flight']}, в очереди {processing['queued']}, "
+        f"обработано {processing['processed']}"
+    )
 
-    # add handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CallbackQueryHandler(button_handler))
+    # outgoing requests, shared by every bot of the process
+    outbound = get_throttler().get_stats()
+    lines.append(
+        f"Исходящие (все боты): отправлено {outbound['sent']}, объединено правок {outbound['coalesced']}, "
+        f"повторов после RetryAfter {outbound['retries']}"
+    )
 
-    # run periodic sync in background
-    from sync import perform_sync_if_needed
+    # incoming updates dropped before the handlers, also shared by every bot
+    inbound = get_inbound_guard().get_stats()
+    lines.append(
+        f"Входящие (все боты): принято {inbound['allowed']}, повторных нажатий {inbound['duplicates']}, "
+        f"сверх лимита {inbound['limited']}"
+    )
 
-    # check if job queue is available
-    if application.job_queue:
-        async def periodic_sync(context: ContextTypes.DEFAULT_TYPE):
-            perform_sync_if_needed()
+    # faq reloads of every bot, from pushes and expired snapshots
+    reloads = faq_reloader.get_stats()
+    lines.append(
+        f"Справочник (все боты): запросов на обновление {reloads['requested']}, перечитываний {reloads['reloads']}, "
+        f"идёт сейчас {reloads['running']}"
+    )
+
+    await get_throttler().reply(update.message, "\n".join(lines), parse_mode='HTML')
+
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """admin-only command: /export [users|ratings] [csv|jsonl|parquet] [full]"""
+    if not is_admin(update):
+        return
+
+    args = [arg.lower() for arg in context.args or []]
+    tables = [arg for arg in args if arg in ('users', 'ratings')] or ['users', 'ratings']
+    formats = [arg for arg in args if arg in EXPORT_FORMATS]
+    fmt = formats[0] if formats else 'csv'
+    full = 'full' in args
+
+    tenant = get_current_tenant()
+    throttler = get_throttler()
+
+    for table in tables:
+        try:
+            # streaming the table is blocking work, keep it off the event loop
+            result = await run_in_sync_pool(tenant, export_table, table, fmt, full)
+        except Exception as e:
+            logger.error(f"error exporting {table}: {e}")
+            await throttler.reply(update.message, f"Не удалось выгрузить {table}: {html.escape(str(e))}")
+            continue
+
+        caption = f"{table}: {result['rows']} строк ({'полная выгрузка' if full else 'с прошлой выгрузки'})"
+        if result['rows'] and os.path.getsize(result['path']) <= MAX_DOCUMENT_SIZE:
+            with open(result['path'], 'rb') as document:
+                await throttler.send_document(context.bot, update.effective_chat.id, document, caption=caption)
+        else:
+            await throttler.reply(update.message, f"{caption}\nФайл: {result['path']}")
+
+
+def format_broadcast(broadcast):
+    """progress line of a broadcast for admins"""
+    statuses = {'running': 'идёт', 'done': 'завершена', 'cancelled': 'остановлена'}
+    # claimed users without an outcome were being sent to when the process stopped
+    unknown = broadcast['claimed'] - broadcast['sent'] - broadcast['blocked'] - broadcast['failed']
+    if broadcast['status'] == 'running':
+        unknown = 0
+
+    text = (
+        f"Рассылка #{broadcast['id']} ({statuses.get(broadcast['status'], broadcast['status'])}): "
+        f"отправлено {broadcast['sent']} из {broadcast['total']}, "
+        f"заблокировали бота {broadcast['blocked']}, ошибок {broadcast['failed']}"
+    )
+    if unknown > 0:
+        text += f", без подтверждения {unknown}"
+    return text
+
+
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """admin-only command: /broadcast <text>, /broadcast status, /broadcast stop"""
+    if not is_admin(update):
+        return
+
+    throttler = get_throttler()
+    args = context.args or []
+    action = args[0].lower() if len(args) == 1 else None
+
+    if not args or action == 'status':
+        broadcast = get_latest_broadcast()
+        await throttler.reply(update.message, format_broadcast(broadcast) if broadcast else "Рассылок ещё не было.")
+        return
+
+    if action == 'stop':
+        running = get_running_broadcasts()
+        for broadcast in running:
+            set_broadcast_status(broadcast['id'], 'cancelled')
+        await throttler.reply(update.message, "Рассылка остановлена." if running else "Нет активной рассылки.")
+        return
+
+    if get_running_broadcasts():
+        await throttler.reply(update.message, "Рассылка уже идёт, дождитесь её окончания или остановите: /broadcast stop")
+        return
+
+    # keep the admin's formatting, everything after the command is the message
+    text = update.message.text_html.split(maxsplit=1)[1]
+
+    broadcast_id = create_broadcast(text, 'HTML', update.effective_user.id)
+    start_broadcast_task(context.bot, get_current_tenant(), broadcast_id)
+    await throttler.reply(update.message, f"Рассылка #{broadcast_id} запущена. Прогресс: /broadcast status")
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """admin-only command: /profile [seconds], profile the bot for a while and send the summary"""
+    if not is_admin(update):
+        return
+
+    throttler = get_throttler()
+    try:
+        seconds = int(context.args[0]) if context.args else DEFAULT_PROFILE_SECONDS
+    except ValueError:
+        await throttler.reply(update.message, "Использование: /profile [секунды]")
+        return
+    seconds = max(1, min(seconds, PROFILE_MAX_SECONDS))
+
+    profiler = get_profiler()
+    if not profiler.start(seconds):
+        await throttler.reply(update.message, "Профилирование уже идёт.")
+        return
 
-        application.job_queue.run_repeating(periodic_sync, interval=60, first=10)
+    async def finish():
+        # wait outside the handler, so updates keep being processed during the window
+        await asyncio.sleep(seconds)
+        try:
+            summary_path = profiler.stop()
+            with open(summary_path, 'rb') as document:
+                await throttler.send_document(context.bot, chat_id, document,
+                                              caption=f"Профиль за {seconds} с, дампы в {profiler.directory}")
+        except Exception as e:
+            logger.error(f"error finishing profile: {e}")
+            try:
+                await throttler.send_message(context.bot, chat_id, f"Не удалось сохранить профиль: {e}")
+            except Exception as report_error:
+                logger.error(f"error reporting failed profile: {report_error}")
+
+    chat_id = update.effective_chat.id
+    task = asyncio.get_running_loop().create_task(finish())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+    await throttler.reply(update.message, f"Профилирование включено на {seconds} с.")
+
+
+async def links_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """admin-only command: /links [language], shareable deep links to every category and article"""
+    if not is_admin(update):
+        return
+
+    # links resolve in the snapshot of the user's language, so they are listed per language
+    language = context.args[0].lower() if context.args else user_language(update)
+    data = get_faq_data(language)
+    if not data:
+        await get_throttler().reply(update.message, "Информация пока не загружена.")
+        return
+
+    username = context.bot.username
+    lines = []
+    for category, articles in data.items():
+        lines.append(f"{category}: {make_link(username, category_payload(category))}")
+        for article in articles:
+            lines.append(f"  {article['title']}: {make_link(username, article_payload(category, article['title']))}")
+    text = "\n".join(lines)
+
+    # long lists don't fit in one message, send them as a file
+    if len(text) <= MAX_MESSAGE_LENGTH:
+        await get_throttler().reply(update.message, text, disable_web_page_preview=True)
     else:
+        await get_throttler().send_document(context.bot, update.effective_chat.id, text.encode('utf-8'),
+                                            filename='links.txt', caption="Ссылки на категории и статьи")
+
+
+async def reload_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """admin-only command: refresh the faq from the sheet now"""
+    if not is_admin(update):
+        return
+
+    faq_reloader.request(get_current_tenant())
+    await get_throttler().reply(update.message, "Обновление справочника запущено, изменения появятся через несколько секунд.")
+
+
+def init_databases():
+    """readiness check: the data volume is mounted and every tenant schema is in place"""
+    for tenant in get_tenants():
+        run_for_tenant(tenant, init_db)
+    return True
+
+
+def build_application(tenant):
+    """create the telegram application of one tenant with all handlers bound to it"""
+    application = (
+        Application.builder()
+        .token(tenant.token)
+        .concurrent_updates(ChatOrderedUpdateProcessor(UPDATE_CONCURRENCY, admit=bind(tenant, guard_update)))
+        .build()
+    )
+
+    # add handlers, the flood guard runs in the update processor before them
+    application.add_handler(CommandHandler("start", bind(tenant, start)))
+    application.add_handler(CommandHandler("help", bind(tenant, help_command)))
+    application.add_handler(CommandHandler("stats", bind(tenant, stats_command)))
+    application.add_handler(CommandHandler("export", bind(tenant, export_command)))
+    application.add_handler(CommandHandler("broadcast", bind(tenant, broadcast_command)))
+    application.add_handler(CommandHandler("profile", bind(tenant, profile_command)))
+    application.add_handler(CommandHandler("links", bind(tenant, links_command)))
+    application.add_handler(CommandHandler("reload", bind(tenant, reload_command)))
+    application.add_handler(CallbackQueryHandler(bind(tenant, button_handler)))
+
+    return application
+
+
+def schedule_background_jobs(application, tenants):
+    """run sync and retention of every tenant from one job queue in the shared worker pool"""
+    from sync import perform_sync_if_needed
+
+    # check if job queue is available
+    if not application.job_queue:
         logger.warning("job queue not available, periodic sync will not run automatically")
         logger.warning("install python-telegram-bot[job-queue] for automated sync")
+        return
+
+    async def periodic_sync(context: ContextTypes.DEFAULT_TYPE):
+        await asyncio.gather(*(run_in_sync_pool(tenant, perform_sync_if_needed) for tenant in tenants))
+
+    async def periodic_retention(context: ContextTypes.DEFAULT_TYPE):
+        await asyncio.gather(*(run_in_sync_pool(tenant, run_retention_if_needed) for tenant in tenants))
+
+    application.job_queue.run_repeating(periodic_sync, interval=60, first=10)
+    application.job_queue.run_repeating(periodic_retention, interval=3600, first=300)
+
+
+async def run_applications(applications, tenants, timer):
+    """run every tenant bot on one event loop until interrupted"""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # signal handlers are not available on windows
+            pass
 
-    # start bot
-    application.run_polling()
+    started = []
+    watchdog = LoopWatchdog() if LOOP_LAG_THRESHOLD > 0 else None
+    reload_server = None
+    faq_reloader.start()
+
+    # warm the faq caches in the background while the bots connect, so the first users
+    # don't wait for google; updates arriving before that see the empty cache and don't
+    # start a second read
+    for tenant in tenants:
+        faq_reloader.ensure(tenant)
+
+    try:
+        for application in applications:
+            await application.initialize()
+            await application.updater.start_polling()
+            await application.start()
+            started.append(application)
+
+        timer.end("telegram")
+        timer.report()
+
+        if watchdog:
+            watchdog.start()
+
+        # resume broadcasts interrupted by the previous shutdown
+        for application, tenant in zip(applications, tenants):
+            for broadcast in run_for_tenant(tenant, get_running_broadcasts):
+                logger.info(f"resuming broadcast {broadcast['id']} of {tenant.name}")
+                start_broadcast_task(application.bot, tenant, broadcast['id'])
+
+        # push invalidation from sheet edit triggers
+        if RELOAD_TOKEN:
+            reload_server = await start_reload_server(faq_reloader, tenants, RELOAD_HOST, RELOAD_PORT, RELOAD_TOKEN)
+        else:
+            logger.info("RELOAD_TOKEN not set, faq reload endpoint disabled")
+
+        await stop_event.wait()
+    finally:
+        if reload_server:
+            reload_server.close()
+            await reload_server.wait_closed()
+        if watchdog:
+            watchdog.stop()
+        await stop_broadcast_tasks()
+
+        for application in reversed(started):
+            if application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            await application.shutdown()
+
+
+def main():
+    """start the bot, or every bot of the tenants file"""
+    setup_logging()
+    timer = StartupTimer()
+    timer.record("imports", timer.started)
+
+    tenants = get_tenants()
+    for tenant in tenants:
+        if not tenant.token:
+            logger.error(f"TELEGRAM_TOKEN not set for {tenant.name}!")
+            return
+
+    # wait for real dependencies instead of a fixed delay
+    with timer.phase("database"):
+        if not wait_until_ready("database", init_databases, STARTUP_TIMEOUT):
+            logger.error("database is not available, exiting")
+            return
+
+    # the one-time rebuild for retention holds the database write lock,
+    # so it happens before the bots start saving users and ratings
+    with timer.phase("vacuum"):
+        for tenant in tenants:
+            run_for_tenant(tenant, prepare_retention)
+
+    with timer.phase("network"):
+        wait_until_ready("telegram api", lambda: can_connect(TELEGRAM_API_HOST), STARTUP_TIMEOUT)
+
+    # create applications, one per tenant on a shared event loop
+    with timer.phase("application"):
+        applications = [build_application(tenant) for tenant in tenants]
+        schedule_background_jobs(applications[0], tenants)
+
+    # start bots, the telegram phase ends once every bot is polling
+    timer.begin("telegram")
+    asyncio.run(run_applications(applications, tenants, timer))
 
 
 if __name__ == '__main__':
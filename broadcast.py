@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from telegram.error import Forbidden, TelegramError
+from config import BROADCAST_CONCURRENCY, BROADCAST_BATCH_SIZE
+from database import (
+    get_broadcast, set_broadcast_status, claim_broadcast_recipients,
+    record_broadcast_results, release_broadcast_recipients
+)
+from tenants import activate
+from throttler import get_throttler
+
+logger = logging.getLogger(__name__)
+
+# broadcasts running in this process, cancelled on shutdown and resumed on the next start
+running_tasks = set()
+
+
+class AttemptRecorder:
+    """bot stand-in noting the chats a send actually went out to, after any throttler wait"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.token = getattr(bot, 'token', None)  # the throttler keeps its buckets per token
+        self.attempted = set()
+
+    async def send_message(self, chat_id, **kwargs):
+        self.attempted.add(chat_id)
+        return await self.bot.send_message(chat_id=chat_id, **kwargs)
+
+
+async def send_to_recipient(bot, throttler, broadcast, recipient):
+    """send the broadcast to one user and return the outcome: 'sent', 'blocked' or 'failed'"""
+    try:
+        await throttler.send_message(bot, recipient['chat_id'], broadcast['text'], parse_mode=broadcast['parse_mode'])
+        return 'sent'
+    except Forbidden:
+        # the user blocked the bot or deleted their account
+        return 'blocked'
+    except TelegramError as e:
+        # includes RetryAfter once the throttler has run out of retries
+        logger.warning("broadcast %s failed for user %s: %s", broadcast['id'], recipient['user_id'], e)
+        return 'failed'
+    except Exception as e:
+        logger.error("broadcast %s error for user %s: %s", broadcast['id'], recipient['user_id'], e)
+        return 'failed'
+
+
+async def run_broadcast(bot, broadcast_id, throttler=None,
+                        concurrency=BROADCAST_CONCURRENCY, batch_size=BROADCAST_BATCH_SIZE):
+    """
+    send a broadcast of the current tenant to every recipient not reached yet
+
+    recipients are streamed from the database in batches; each batch is
+    claimed before sending, so a broadcast interrupted by a crash resumes
+    after the last claimed user and nobody gets the message twice. on a
+    graceful stop, claimed users whose send never started are released and
+    go first on resume; only users whose send was in flight are left out.
+    the throttler keeps sends within the global and per-chat limits, and
+    any object with an async send_message can stand in for the bot.
+
+    returns:
+        the broadcast row with its final counters
+    """
+    throttler = throttler or get_throttler()
+    semaphore = asyncio.Semaphore(concurrency)
+    sender = AttemptRecorder(bot)
+
+    async def deliver(broadcast, recipient):
+        async with semaphore:
+            return recipient['user_id'], await send_to_recipient(sender, throttler, broadcast, recipient)
+
+    while True:
+        # a stop from /broadcast is picked up between batches
+        broadcast = get_broadcast(broadcast_id)
+        if broadcast is None or broadcast['status'] != 'running':
+            break
+
+        recipients = claim_broadcast_recipients(broadcast_id, batch_size)
+        if not recipients:
+            set_broadcast_status(broadcast_id, 'done')
+            logger.info(f"broadcast {broadcast_id} finished")
+            break
+
+        tasks = [asyncio.ensure_future(deliver(broadcast, recipient)) for recipient in recipients]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # on cancellation keep the outcomes that are known and release the users never
+            # sent to; the ones whose send was in flight stay claimed and are not retried
+            finished = [task.done() and not task.cancelled() for task in tasks]
+            record_broadcast_results(broadcast_id, [task.result() for task, done in zip(tasks, finished) if done])
+            release_broadcast_recipients(broadcast_id, [
+                recipient['user_id'] for recipient, done in zip(recipients, finished)
+                if not done and recipient['chat_id'] not in sender.attempted
+            ])
+
+    return get_broadcast(broadcast_id)
+
+
+def start_broadcast_task(bot, tenant, broadcast_id):
+    """run a broadcast of the tenant in the background of the event loop"""
+    async def run():
+        with activate(tenant):
+            try:
+                await run_broadcast(bot, broadcast_id)
+            except asyncio.CancelledError:
+                logger.info(f"broadcast {broadcast_id} of {tenant.name} interrupted, it resumes on the next start")
+                raise
+            except Exception as e:
+                logger.error(f"broadcast {broadcast_id} of {tenant.name} stopped: {e}")
+
+    task = asyncio.get_running_loop().create_task(run())
+    running_tasks.add(task)
+    task.add_done_callback(running_tasks.discard)
+    return task
+
+
+async def stop_broadcast_tasks():
+    """cancel running broadcasts on shutdown, their progress is already stored"""
+    tasks = list(running_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
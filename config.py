@@ -0,0 +1,127 @@
+import os
+import atexit
+from dotenv import load_dotenv
+
+# load environment variables from .env file, once for the whole process;
+# every setting below is read from the environment right after
+load_dotenv()
+
+# telegram
+TELEGRAM_TOKEN = os.environ.get('TELEGRAM_TOKEN')
+ADMIN_IDS = {int(x) for x in os.environ.get('ADMIN_IDS', '').split(',') if x.strip()}  # telegram user ids
+
+# multi-tenant mode: json file with one entry per bot, unset serves a single bot from the variables here
+TENANTS_FILE = os.environ.get('TENANTS_FILE')
+SYNC_WORKERS = int(os.environ.get('SYNC_WORKERS', '2'))  # threads shared by all tenants for sync work
+
+# faq content
+FAQ_UPDATE_INTERVAL = int(os.environ.get('FAQ_UPDATE_INTERVAL', '300'))  # refresh faq data every 5 minutes by default
+
+# faq tab per language as 'ru:FAQ,en:FAQ_en'; users get the tab of their telegram language
+# or the default one. unset serves the first sheet to everyone
+FAQ_LANGUAGES = {
+    language.strip().lower(): title.strip()
+    for language, title in (item.split(':', 1) for item in os.environ.get('FAQ_LANGUAGES', '').split(',') if ':' in item)
+}
+FAQ_DEFAULT_LANGUAGE = (os.environ.get('FAQ_DEFAULT_LANGUAGE') or next(iter(FAQ_LANGUAGES), 'ru')).lower()
+
+# push invalidation: sheet edit triggers call POST /reload with RELOAD_TOKEN, unset token disables the endpoint;
+# a burst of reload requests is merged into one refresh after FAQ_RELOAD_DELAY quiet seconds
+RELOAD_TOKEN = os.environ.get('RELOAD_TOKEN')
+RELOAD_HOST = os.environ.get('RELOAD_HOST', '127.0.0.1')
+RELOAD_PORT = int(os.environ.get('RELOAD_PORT', '8080'))
+FAQ_RELOAD_DELAY = float(os.environ.get('FAQ_RELOAD_DELAY', '3'))
+FAQ_RELOAD_MAX_DELAY = float(os.environ.get('FAQ_RELOAD_MAX_DELAY', '30'))
+
+# database file path
+DB_FILE = os.environ.get('DB_FILE', 'bot_data.db')
+
+# google sheets
+SPREADSHEET_ID = os.environ.get('SPREADSHEET_ID')
+CREDENTIALS_FILE = os.environ.get('CREDENTIALS_FILE', 'credentials.json')
+USERS_SHEET_NAME = os.environ.get('USERS_SHEET_NAME', 'Users')
+RATINGS_SHEET_NAME = os.environ.get('RATINGS_SHEET_NAME', 'Ratings')
+SUMMARY_SHEET_NAME = os.environ.get('SUMMARY_SHEET_NAME', 'Summary')
+
+# retention: synced rows older than this many days move to archive files, 0 keeps them forever.
+# archived users still get broadcasts, the audience is kept in its own table
+RATINGS_RETENTION_DAYS = int(os.environ.get('RATINGS_RETENTION_DAYS', '0'))
+USERS_RETENTION_DAYS = int(os.environ.get('USERS_RETENTION_DAYS', '0'))
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'archive')
+RETENTION_INTERVAL = int(os.environ.get('RETENTION_INTERVAL', '86400'))  # once a day by default
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '5000'))
+VACUUM_PAGES = int(os.environ.get('VACUUM_PAGES', '2000'))  # free pages returned per retention run
+
+# exports
+EXPORT_DIR = os.environ.get('EXPORT_DIR', 'exports')
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '5000'))  # rows held in memory at once
+
+# where sync sends data: comma separated 'sheets', 'jsonl:<dir>', 'csv:<dir>', 'sql:<sqlite file>';
+# paths may contain {tenant}
+SYNC_SINKS = os.environ.get('SYNC_SINKS', 'sheets')
+
+# sheet capacity: rows are allocated in blocks, the ratings sheet rolls over to a
+# period-named sheet (Ratings_2026_10) when it gets too big or the spreadsheet nears its cell limit
+SHEET_ROW_BLOCK = int(os.environ.get('SHEET_ROW_BLOCK', '5000'))
+SHEET_MAX_ROWS = int(os.environ.get('SHEET_MAX_ROWS', '200000'))
+SHEET_CELL_LIMIT = int(os.environ.get('SHEET_CELL_LIMIT', '10000000'))  # google sheets limit per spreadsheet
+SHEET_ROTATE_RATIO = float(os.environ.get('SHEET_ROTATE_RATIO', '0.8'))  # share of the cell limit
+
+# sync intervals
+SYNC_INTERVAL = int(os.environ.get('SYNC_INTERVAL', '300'))  # 5 minutes by default
+
+# outgoing telegram limits: about 30 messages per second overall and about 1 per second per chat
+TG_GLOBAL_RATE = float(os.environ.get('TG_GLOBAL_RATE', '30'))  # requests per second for the whole bot
+TG_GLOBAL_BURST = int(os.environ.get('TG_GLOBAL_BURST', '30'))
+TG_CHAT_RATE = float(os.environ.get('TG_CHAT_RATE', '1'))  # requests per second for one chat
+TG_CHAT_BURST = int(os.environ.get('TG_CHAT_BURST', '3'))
+TG_MAX_RETRIES = int(os.environ.get('TG_MAX_RETRIES', '3'))
+
+# broadcasts: messages in flight at once and recipients claimed per database write;
+# throughput is bounded by TG_GLOBAL_RATE
+BROADCAST_CONCURRENCY = int(os.environ.get('BROADCAST_CONCURRENCY', '20'))
+BROADCAST_BATCH_SIZE = int(os.environ.get('BROADCAST_BATCH_SIZE', '200'))
+
+# updates of different chats handled at once per bot, updates of one chat always run in order
+UPDATE_CONCURRENCY = int(os.environ.get('UPDATE_CONCURRENCY', '16'))
+
+# incoming per-user limits
+INBOUND_USER_RATE = float(os.environ.get('INBOUND_USER_RATE', '2'))  # sustained updates per second per user
+INBOUND_USER_BURST = int(os.environ.get('INBOUND_USER_BURST', '5'))
+INBOUND_DUPLICATE_WINDOW = float(os.environ.get('INBOUND_DUPLICATE_WINDOW', '1.5'))  # seconds
+INBOUND_MAX_TRACKED_USERS = int(os.environ.get('INBOUND_MAX_TRACKED_USERS', '10000'))
+
+# startup readiness checks
+STARTUP_TIMEOUT = float(os.environ.get('STARTUP_TIMEOUT', '30'))  # seconds to wait for dependencies
+TELEGRAM_API_HOST = os.environ.get('TELEGRAM_API_HOST', 'api.telegram.org')
+
+# profiling: /profile writes dumps here, and a warning with the loop stack is logged
+# whenever a callback blocks the event loop longer than LOOP_LAG_THRESHOLD seconds (0 disables)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_MAX_SECONDS = int(os.environ.get('PROFILE_MAX_SECONDS', '300'))
+LOOP_LAG_THRESHOLD = float(os.environ.get('LOOP_LAG_THRESHOLD', '0.5'))
+
+# logging: records go through a queue to a background writer, so handlers never wait on stdout
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_JSON = os.environ.get('LOG_JSON', 'false').lower() in ('1', 'true', 'yes')  # one json object per line
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))  # records beyond this are dropped
+LOG_RATE_LIMIT = float(os.environ.get('LOG_RATE_LIMIT', '10'))  # records below ERROR per second per message, 0 disables
+LOG_RATE_BURST = int(os.environ.get('LOG_RATE_BURST', '20'))
+
+logging_configured = False
+
+
+def setup_logging():
+    """configure root logging once, entry points call this before anything else"""
+    global logging_configured
+
+    if logging_configured:
+        return
+
+    from log_pipeline import start_queue_logging
+
+    listener = start_queue_logging(LOG_LEVEL, LOG_FORMAT, LOG_JSON, LOG_QUEUE_SIZE, LOG_RATE_LIMIT, LOG_RATE_BURST)
+    # write out whatever is still queued when the process exits
+    atexit.register(listener.stop)
+    logging_configured = True
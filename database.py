@@ -1,24 +1,15 @@
 import sqlite3
-import os
 import logging
 import time
 from datetime import datetime
-from dotenv import load_dotenv
-load_dotenv()
-# setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
-logger = logging.getLogger(__name__)
+from tenants import get_current_tenant
 
-# database file path
-DB_FILE = os.environ.get('DB_FILE', 'bot_data.db')
+logger = logging.getLogger(__name__)
 
 
 def get_db_connection():
-    """Get a connection to the SQLite database"""
-    conn = sqlite3.connect(DB_FILE)
+    """Get a connection to the SQLite database of the current tenant"""
+    conn = sqlite3.connect(get_current_tenant().db_file)
     conn.row_factory = sqlite3.Row  # return rows as dictionaries
     return conn
 
@@ -28,6 +19,9 @@ def init_db():
     conn = get_db_connection()
     cursor = conn.cursor()
 
+    # WAL lets long reads (exports, sync) run without blocking handler writes
+    cursor.execute('PRAGMA journal_mode = WAL')
+
     # create users table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
@@ -45,6 +39,8 @@ def init_db():
     )
     ''')
 
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_last_seen ON users (last_seen)')
+
     # create ratings table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS ratings (
@@ -60,6 +56,113 @@ def init_db():
     )
     ''')
 
+    # create per-article rating counters, kept up to date by save_rating
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS article_stats (
+        category TEXT,
+        article_id TEXT,
+        article_title TEXT,
+        up_count INTEGER DEFAULT 0,
+        down_count INTEGER DEFAULT 0,
+        updated_at TEXT,
+        synced INTEGER DEFAULT 0,
+        PRIMARY KEY (category, article_id)
+    )
+    ''')
+
+    # latest vote of every user per article; retention archives old ratings rows
+    # but never this table, so a repeated or changed vote is counted correctly
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS rating_votes (
+        user_id INTEGER,
+        category TEXT,
+        article_id TEXT,
+        rating TEXT,
+        PRIMARY KEY (user_id, category, article_id)
+    )
+    ''')
+
+    # backfill votes from the ratings still in the database on first run
+    cursor.execute('SELECT COUNT(*) FROM rating_votes')
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+        INSERT OR IGNORE INTO rating_votes (user_id, category, article_id, rating)
+        SELECT user_id, category, article_id, rating FROM ratings
+        ''')
+
+    # backfill counters from existing ratings on first run
+    cursor.execute('SELECT COUNT(*) FROM article_stats')
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+        INSERT INTO article_stats
+        (category, article_id, article_title, up_count, down_count, updated_at, synced)
+        SELECT category, article_id, MAX(article_title),
+               SUM(CASE WHEN rating LIKE '👍%' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN rating LIKE '👍%' THEN 0 ELSE 1 END),
+               MAX(timestamp), 0
+        FROM ratings
+        GROUP BY category, article_id
+        ''')
+
+    # create broadcast tables; a recipient row is written before the message goes out,
+    # so an interrupted broadcast never sends to the same user twice
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT,
+        parse_mode TEXT,
+        created_by INTEGER,
+        created_at TEXT,
+        finished_at TEXT,
+        status TEXT,
+        total INTEGER DEFAULT 0,
+        last_user_id INTEGER DEFAULT 0,
+        claimed INTEGER DEFAULT 0,
+        sent INTEGER DEFAULT 0,
+        blocked INTEGER DEFAULT 0,
+        failed INTEGER DEFAULT 0
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS broadcast_recipients (
+        broadcast_id INTEGER,
+        user_id INTEGER,
+        status TEXT,
+        updated_at TEXT,
+        PRIMARY KEY (broadcast_id, user_id)
+    )
+    ''')
+
+    # pending rows each sync sink already stored while another sink was failing,
+    # by a hash of the row, so a retry only sends a sink what it is missing
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sink_progress (
+        sink TEXT,
+        tbl TEXT,
+        row_hash TEXT,
+        PRIMARY KEY (sink, tbl, row_hash)
+    )
+    ''')
+
+    # broadcast audience: users whose last /start came from a private chat. kept apart
+    # from users, which retention archives by last_seen, so archived users still get
+    # broadcasts; updated by save_user
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS broadcast_audience (
+        user_id INTEGER PRIMARY KEY,
+        chat_id INTEGER
+    )
+    ''')
+
+    # backfill the audience from the users still in the database on first run
+    cursor.execute('SELECT COUNT(*) FROM broadcast_audience')
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f'''
+        INSERT OR IGNORE INTO broadcast_audience (user_id, chat_id)
+        SELECT user_id, chat_id FROM users WHERE {BROADCAST_RECIPIENTS}
+        ''')
+
     # create faq content table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS faq_content (
@@ -86,6 +189,16 @@ def init_db():
                    ('last_users_sync', '0'))
     cursor.execute('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)',
                    ('last_ratings_sync', '0'))
+    cursor.execute('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)',
+                   ('last_retention_run', '0'))
+    cursor.execute('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)',
+                   ('archived_users_rows', '0'))
+    cursor.execute('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)',
+                   ('archived_ratings_rows', '0'))
+    cursor.execute('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)',
+                   ('last_export_users', ''))
+    cursor.execute('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)',
+                   ('last_export_ratings', ''))
 
     conn.commit()
     conn.close()
@@ -132,10 +245,17 @@ def save_user(user_data):
                 user_data['chat_id'], user_data['chat_type'], current_time, current_time, 0
             ))
 
+        # a /start from a private chat adds the user to the broadcast audience, one from a group removes them
+        if user_data['chat_id'] is not None and user_data['chat_type'] == 'private':
+            cursor.execute('REPLACE INTO broadcast_audience (user_id, chat_id) VALUES (?, ?)',
+                           (user_data['user_id'], user_data['chat_id']))
+        else:
+            cursor.execute('DELETE FROM broadcast_audience WHERE user_id = ?', (user_data['user_id'],))
+
         conn.commit()
         return True
     except Exception as e:
-        logger.error(f"Error saving user: {e}")
+        logger.error("Error saving user: %s", e)
         conn.rollback()
         return False
     finally:
@@ -173,13 +293,23 @@ def mark_users_synced(user_ids):
 
 # Ratings methods
 def save_rating(rating_data):
-    """Save or update article rating in local database"""
+    """Save or update article rating in local database and its per-article counters"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     try:
+        # previous vote of this user for this article, if any, even if its ratings row was archived
+        cursor.execute('SELECT rating FROM rating_votes WHERE user_id = ? AND category = ? AND article_id = ?',
+                       (rating_data['user_id'], rating_data['category'], rating_data['article_id']))
+        previous = cursor.fetchone()
+
+        cursor.execute('''
+        REPLACE INTO rating_votes (user_id, category, article_id, rating)
+        VALUES (?, ?, ?, ?)
+        ''', (rating_data['user_id'], rating_data['category'], rating_data['article_id'], rating_data['rating']))
+
         # Using REPLACE to handle the UNIQUE constraint
         cursor.execute('''
         REPLACE INTO ratings 
@@ -190,10 +320,36 @@ def save_rating(rating_data):
             rating_data['article_title'], rating_data['rating'], current_time, 0
         ))
 
+        # update counters: a repeated vote changes nothing,
+        # a changed vote moves one count from the other column
+        up_delta, down_delta = (1, 0) if rating_data['rating_type'] == 'up' else (0, 1)
+        if previous is not None:
+            if previous['rating'] == rating_data['rating']:
+                up_delta, down_delta = 0, 0
+            elif rating_data['rating_type'] == 'up':
+                down_delta = -1
+            else:
+                up_delta = -1
+
+        cursor.execute('''
+        INSERT INTO article_stats
+        (category, article_id, article_title, up_count, down_count, updated_at, synced)
+        VALUES (?, ?, ?, ?, ?, ?, 0)
+        ON CONFLICT(category, article_id) DO UPDATE SET
+            article_title = excluded.article_title,
+            up_count = MAX(up_count + excluded.up_count, 0),
+            down_count = MAX(down_count + excluded.down_count, 0),
+            updated_at = excluded.updated_at,
+            synced = 0
+        ''', (
+            rating_data['category'], rating_data['article_id'], rating_data['article_title'],
+            up_delta, down_delta, current_time
+        ))
+
         conn.commit()
         return True
     except Exception as e:
-        logger.error(f"Error saving rating: {e}")
+        logger.error("Error saving rating: %s", e)
         conn.rollback()
         return False
     finally:
@@ -228,6 +384,424 @@ def mark_ratings_synced(rating_ids):
     conn.close()
 
 
+# Article stats methods
+def get_article_stats(limit=None):
+    """Get per-article rating counters, most voted first"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    query = '''
+    SELECT category, article_id, article_title, up_count, down_count, updated_at
+    FROM article_stats
+    ORDER BY up_count + down_count DESC, category, article_id
+    '''
+    if limit:
+        cursor.execute(query + ' LIMIT ?', (limit,))
+    else:
+        cursor.execute(query)
+    stats = [dict(row) for row in cursor.fetchall()]
+
+    conn.close()
+    return stats
+
+
+def get_rating_totals():
+    """Get overall rating counters summed over all articles"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+    SELECT COUNT(*) AS articles,
+           COALESCE(SUM(up_count), 0) AS up_count,
+           COALESCE(SUM(down_count), 0) AS down_count
+    FROM article_stats
+    ''')
+    totals = dict(cursor.fetchone())
+
+    conn.close()
+    return totals
+
+
+def has_unsynced_article_stats():
+    """Check if any article counters changed since the last summary sync"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT 1 FROM article_stats WHERE synced = 0 LIMIT 1')
+    result = cursor.fetchone()
+
+    conn.close()
+    return result is not None
+
+
+def mark_article_stats_synced(stats):
+    """Mark article counters as synced, unless they changed after being read"""
+    if not stats:
+        return
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.executemany('''
+    UPDATE article_stats SET synced = 1
+    WHERE category = ? AND article_id = ? AND up_count = ? AND down_count = ?
+    ''', [(s['category'], s['article_id'], s['up_count'], s['down_count']) for s in stats])
+    conn.commit()
+    conn.close()
+
+
+# Sink progress methods
+def get_sink_progress(sink, table):
+    """Get the hashes of pending rows of a table that the sink already stored"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT row_hash FROM sink_progress WHERE sink = ? AND tbl = ?', (sink, table))
+    hashes = {row['row_hash'] for row in cursor.fetchall()}
+
+    conn.close()
+    return hashes
+
+
+def add_sink_progress(sink, table, row_hashes):
+    """Remember pending rows that the sink stored"""
+    if not row_hashes:
+        return
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.executemany('INSERT OR IGNORE INTO sink_progress (sink, tbl, row_hash) VALUES (?, ?, ?)',
+                       [(sink, table, row_hash) for row_hash in row_hashes])
+    conn.commit()
+    conn.close()
+
+
+def clear_sink_progress(table):
+    """Forget the progress of every sink for a table, once all of them have its pending rows"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('DELETE FROM sink_progress WHERE tbl = ?', (table,))
+    conn.commit()
+    conn.close()
+
+
+# Retention methods
+# table -> (key column, date column used for the retention cutoff)
+ARCHIVABLE_TABLES = {
+    'users': ('user_id', 'last_seen'),
+    'ratings': ('id', 'timestamp'),
+}
+
+
+def get_archivable_rows(table, cutoff, limit):
+    """Get synced rows older than the cutoff, oldest keys first"""
+    key_column, date_column = ARCHIVABLE_TABLES[table]
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(f'''
+    SELECT * FROM {table}
+    WHERE synced = 1 AND {date_column} < ?
+    ORDER BY {key_column}
+    LIMIT ?
+    ''', (cutoff, limit))
+    rows = [dict(row) for row in cursor.fetchall()]
+
+    conn.close()
+    return rows
+
+
+def delete_archived_rows(table, keys, cutoff):
+    """Delete archived rows, skipping any that were updated after being read"""
+    if not keys:
+        return 0
+
+    key_column, date_column = ARCHIVABLE_TABLES[table]
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    placeholders = ','.join(['?'] * len(keys))
+    cursor.execute(f'''
+    DELETE FROM {table}
+    WHERE {key_column} IN ({placeholders}) AND synced = 1 AND {date_column} < ?
+    ''', list(keys) + [cutoff])
+    deleted = cursor.rowcount
+
+    # keep a running total of archived rows
+    cursor.execute('UPDATE settings SET value = CAST(value AS INTEGER) + ? WHERE key = ?',
+                   (deleted, f'archived_{table}_rows'))
+
+    conn.commit()
+    conn.close()
+    return deleted
+
+
+def enable_incremental_vacuum():
+    """Switch the database to incremental auto-vacuum, rebuilding it once if needed; True if it was rebuilt"""
+    conn = get_db_connection()
+
+    mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+    rebuilt = mode != 2
+    if rebuilt:
+        # the mode only takes effect after a full vacuum, so this runs once per database
+        logger.info("switching database to incremental auto-vacuum, rebuilding it once, this may take a while")
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+
+    conn.close()
+    return rebuilt
+
+
+def compact_db(max_pages):
+    """Return up to max_pages free pages to the filesystem and refresh query planner stats"""
+    conn = get_db_connection()
+
+    free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    conn.execute(f'PRAGMA incremental_vacuum({int(max_pages)})')
+    free_after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    conn.execute('PRAGMA optimize')
+
+    conn.commit()
+    conn.close()
+    return free_before - free_after
+
+
+def get_db_stats():
+    """Get database size and row counts of the growing tables"""
+    conn = get_db_connection()
+
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    stats = {
+        'size_bytes': conn.execute('PRAGMA page_count').fetchone()[0] * page_size,
+        'free_bytes': conn.execute('PRAGMA freelist_count').fetchone()[0] * page_size,
+    }
+    for table in ARCHIVABLE_TABLES:
+        stats[f'{table}_rows'] = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    conn.close()
+    return stats
+
+
+# Export methods
+# table -> (watermark column for incremental exports, comparison with the last watermark);
+# users are updated in place, so rows seen in the same second as the watermark are exported again
+EXPORT_WATERMARKS = {
+    'users': ('last_seen', '>='),
+    'ratings': ('id', '>'),
+}
+
+
+def iter_table_rows(table, since=None, batch_size=1000):
+    """Stream rows of a table in watermark order, holding one batch in memory at a time"""
+    column, comparison = EXPORT_WATERMARKS[table]
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+
+        if since is None:
+            cursor.execute(f'SELECT * FROM {table} ORDER BY {column}')
+        else:
+            cursor.execute(f'SELECT * FROM {table} WHERE {column} {comparison} ? ORDER BY {column}', (since,))
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    finally:
+        conn.close()
+
+
+# Broadcast methods
+# recipients are users whose last /start came from a private chat, kept in broadcast_audience;
+# this filter only seeds the audience from the users table
+BROADCAST_RECIPIENTS = "chat_id IS NOT NULL AND chat_type = 'private'"
+
+
+def create_broadcast(text, parse_mode, created_by):
+    """Create a running broadcast to every known user and return its id"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    cursor.execute('SELECT COUNT(*) FROM broadcast_audience')
+    total = cursor.fetchone()[0]
+
+    cursor.execute('''
+    INSERT INTO broadcasts (text, parse_mode, created_by, created_at, status, total)
+    VALUES (?, ?, ?, ?, 'running', ?)
+    ''', (text, parse_mode, created_by, current_time, total))
+    broadcast_id = cursor.lastrowid
+
+    conn.commit()
+    conn.close()
+    return broadcast_id
+
+
+def get_broadcast(broadcast_id):
+    """Get a broadcast with its progress counters"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT * FROM broadcasts WHERE id = ?', (broadcast_id,))
+    row = cursor.fetchone()
+
+    conn.close()
+    return dict(row) if row else None
+
+
+def get_latest_broadcast():
+    """Get the most recently created broadcast"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT * FROM broadcasts ORDER BY id DESC LIMIT 1')
+    row = cursor.fetchone()
+
+    conn.close()
+    return dict(row) if row else None
+
+
+def get_running_broadcasts():
+    """Get broadcasts that have not finished, e.g. ones interrupted by a restart"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT * FROM broadcasts WHERE status = 'running' ORDER BY id")
+    broadcasts = [dict(row) for row in cursor.fetchall()]
+
+    conn.close()
+    return broadcasts
+
+
+def set_broadcast_status(broadcast_id, status):
+    """Finish or cancel a broadcast"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor.execute('UPDATE broadcasts SET status = ?, finished_at = ? WHERE id = ?',
+                   (status, current_time, broadcast_id))
+
+    conn.commit()
+    conn.close()
+
+
+def claim_broadcast_recipients(broadcast_id, limit):
+    """
+    Take the next recipients of a broadcast in user id order
+
+    the claim and the cursor move are committed before anything is sent, so
+    after a crash the claimed users are skipped rather than messaged again.
+    users released by an interrupted run are taken before the cursor moves on.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    try:
+        cursor.execute('''
+        SELECT broadcast_audience.user_id, broadcast_audience.chat_id FROM broadcast_recipients
+        JOIN broadcast_audience ON broadcast_audience.user_id = broadcast_recipients.user_id
+        WHERE broadcast_id = ? AND status = 'pending'
+        ORDER BY broadcast_audience.user_id
+        LIMIT ?
+        ''', (broadcast_id, limit))
+        recipients = [dict(row) for row in cursor.fetchall()]
+
+        if recipients:
+            cursor.executemany('''
+            UPDATE broadcast_recipients SET status = 'claimed', updated_at = ?
+            WHERE broadcast_id = ? AND user_id = ?
+            ''', [(current_time, broadcast_id, recipient['user_id']) for recipient in recipients])
+            cursor.execute('UPDATE broadcasts SET claimed = claimed + ? WHERE id = ?',
+                           (len(recipients), broadcast_id))
+            conn.commit()
+            return recipients
+
+        cursor.execute('SELECT last_user_id FROM broadcasts WHERE id = ?', (broadcast_id,))
+        last_user_id = cursor.fetchone()[0]
+
+        cursor.execute('''
+        SELECT user_id, chat_id FROM broadcast_audience
+        WHERE user_id > ?
+        ORDER BY user_id
+        LIMIT ?
+        ''', (last_user_id, limit))
+        recipients = [dict(row) for row in cursor.fetchall()]
+
+        if recipients:
+            cursor.executemany('''
+            INSERT OR IGNORE INTO broadcast_recipients (broadcast_id, user_id, status, updated_at)
+            VALUES (?, ?, 'claimed', ?)
+            ''', [(broadcast_id, recipient['user_id'], current_time) for recipient in recipients])
+
+            cursor.execute('UPDATE broadcasts SET last_user_id = ?, claimed = claimed + ? WHERE id = ?',
+                           (recipients[-1]['user_id'], len(recipients), broadcast_id))
+
+        conn.commit()
+        return recipients
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def release_broadcast_recipients(broadcast_id, user_ids):
+    """Give back claimed recipients whose message was never sent, they are claimed again first"""
+    if not user_ids:
+        return
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    cursor.executemany('''
+    UPDATE broadcast_recipients SET status = 'pending', updated_at = ?
+    WHERE broadcast_id = ? AND user_id = ? AND status = 'claimed'
+    ''', [(current_time, broadcast_id, user_id) for user_id in user_ids])
+    cursor.execute('UPDATE broadcasts SET claimed = claimed - ? WHERE id = ?', (cursor.rowcount, broadcast_id))
+
+    conn.commit()
+    conn.close()
+
+
+def record_broadcast_results(broadcast_id, results):
+    """Store the outcome ('sent', 'blocked' or 'failed') of claimed recipients and update the counters"""
+    if not results:
+        return
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    cursor.executemany('''
+    UPDATE broadcast_recipients SET status = ?, updated_at = ?
+    WHERE broadcast_id = ? AND user_id = ?
+    ''', [(status, current_time, broadcast_id, user_id) for user_id, status in results])
+
+    counts = {'sent': 0, 'blocked': 0, 'failed': 0}
+    for _, status in results:
+        counts[status] += 1
+
+    cursor.execute('UPDATE broadcasts SET sent = sent + ?, blocked = blocked + ?, failed = failed + ? WHERE id = ?',
+                   (counts['sent'], counts['blocked'], counts['failed'], broadcast_id))
+
+    conn.commit()
+    conn.close()
+
+
 # FAQ content methods
 def clear_faq_content():
     """Clear all FAQ content from local database"""
@@ -322,7 +896,3 @@ def set_setting(key, value):
     cursor.execute('UPDATE settings SET value = ? WHERE key = ?', (value, key))
     conn.commit()
     conn.close()
-
-
-# Initialize database
-init_db()
\ No newline at end of file
@@ -0,0 +1,42 @@
+import hashlib
+
+# /start payloads may only use A-Z, a-z, 0-9, _ and - and be at most 64 characters
+CATEGORY_PREFIX = 'c_'
+ARTICLE_PREFIX = 'a_'
+ID_LENGTH = 10
+
+
+def stable_id(*parts):
+    """short id derived from names, so it survives reordering of the faq sheet"""
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()[:ID_LENGTH]
+
+
+def category_payload(category):
+    """deep link payload of a category"""
+    return CATEGORY_PREFIX + stable_id(category)
+
+
+def article_payload(category, title):
+    """deep link payload of an article, changes only if its category or title is renamed"""
+    return ARTICLE_PREFIX + stable_id(category, title)
+
+
+def build_link_index(faq_data):
+    """
+    map every payload of a faq snapshot to its target
+
+    returns:
+        dict of payload -> (category, article index), the index is None for categories
+    """
+    index = {}
+    for category, articles in faq_data.items():
+        index.setdefault(category_payload(category), (category, None))
+        for i, article in enumerate(articles):
+            # an article repeated under the same title is only reachable as the first one
+            index.setdefault(article_payload(category, article['title']), (category, i))
+    return index
+
+
+def make_link(bot_username, payload):
+    """shareable link that opens the bot with /start <payload>"""
+    return f"https://t.me/{bot_username}?start={payload}"
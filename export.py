@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+import os
+import csv
+import json
+import logging
+import argparse
+from datetime import datetime
+from config import setup_logging, EXPORT_BATCH_SIZE
+from database import EXPORT_WATERMARKS, init_db, iter_table_rows, get_setting, set_setting
+from tenants import get_tenants, get_current_tenant, run_for_tenant
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+# column types, used for a stable parquet schema across batches
+EXPORT_COLUMNS = {
+    'users': [
+        ('user_id', 'int'), ('username', 'str'), ('first_name', 'str'), ('last_name', 'str'),
+        ('language_code', 'str'), ('is_bot', 'int'), ('chat_id', 'int'), ('chat_type', 'str'),
+        ('first_seen', 'str'), ('last_seen', 'str'), ('synced', 'int'),
+    ],
+    'ratings': [
+        ('id', 'int'), ('user_id', 'int'), ('category', 'str'), ('article_id', 'str'),
+        ('article_title', 'str'), ('rating', 'str'), ('timestamp', 'str'), ('synced', 'int'),
+    ],
+}
+
+
+def write_csv(path, table, rows):
+    """write rows as csv with a header line"""
+    columns = [name for name, _ in EXPORT_COLUMNS[table]]
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_jsonl(path, table, rows):
+    """write rows as one json object per line"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def write_parquet(path, table, rows):
+    """write rows as parquet, one row group per batch"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("parquet export requires pyarrow, install it with 'pip install pyarrow'") from None
+
+    types = {'int': pa.int64(), 'str': pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS[table]])
+
+    count = 0
+    batch = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch or count == 0:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'parquet': write_parquet,
+}
+
+
+def export_table(table, fmt='csv', full=False, out_dir=None):
+    """
+    stream a table of the current tenant into a file in constant memory
+
+    incremental runs (the default) only export rows past the watermark saved
+    by the previous run; a full run exports everything and resets it. rows
+    moved to the archive by retention are not part of the live table.
+
+    returns:
+        dict with the file path, row count and new watermark
+    """
+    if table not in EXPORT_WATERMARKS:
+        raise ValueError(f"unknown table '{table}', expected one of {', '.join(EXPORT_WATERMARKS)}")
+    if fmt not in WRITERS:
+        raise ValueError(f"unknown format '{fmt}', expected one of {', '.join(EXPORT_FORMATS)}")
+
+    out_dir = out_dir or get_current_tenant().export_dir
+    os.makedirs(out_dir, exist_ok=True)
+
+    watermark_column, _ = EXPORT_WATERMARKS[table]
+    setting_key = f'last_export_{table}'
+    since = None if full else (get_setting(setting_key) or None)
+
+    # track the watermark while streaming, rows arrive in watermark order
+    state = {'watermark': since}
+
+    def rows():
+        for row in iter_table_rows(table, since, EXPORT_BATCH_SIZE):
+            state['watermark'] = row[watermark_column]
+            yield row
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    kind = 'full' if full else 'incremental'
+    path = os.path.join(out_dir, f"{table}_{timestamp}_{kind}.{fmt}")
+
+    # write to a temporary name so readers never see a half-written file
+    partial_path = path + '.part'
+    try:
+        count = WRITERS[fmt](partial_path, table, rows())
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    os.replace(partial_path, path)
+
+    if state['watermark'] is not None:
+        set_setting(setting_key, str(state['watermark']))
+
+    logger.info(f"exported {count} {table} rows to {path}")
+    return {'table': table, 'path': path, 'rows': count, 'watermark': state['watermark']}
+
+
+def main():
+    """export users and ratings from the command line"""
+    parser = argparse.ArgumentParser(description="export bot data to csv, jsonl or parquet files")
+    parser.add_argument('--table', dest='tables', action='append', choices=list(EXPORT_WATERMARKS),
+                        help="table to export, can be repeated, all tables by default")
+    parser.add_argument('--format', dest='fmt', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--full', action='store_true', help="export everything instead of rows since the last export")
+    parser.add_argument('--out', help="output directory, EXPORT_DIR by default")
+    parser.add_argument('--tenant', help="tenant name from TENANTS_FILE, every tenant by default")
+    args = parser.parse_args()
+
+    setup_logging()
+
+    tenants = [t for t in get_tenants() if args.tenant in (None, t.name)]
+    if not tenants:
+        parser.error(f"unknown tenant '{args.tenant}'")
+
+    for tenant in tenants:
+        run_for_tenant(tenant, init_db)
+
+        # keep tenants apart when they share an explicit output directory
+        out_dir = args.out
+        if out_dir and len(tenants) > 1:
+            out_dir = os.path.join(out_dir, tenant.name)
+
+        for table in args.tables or EXPORT_WATERMARKS:
+            try:
+                result = run_for_tenant(tenant, export_table, table, args.fmt, args.full, out_dir)
+            except (RuntimeError, ValueError) as e:
+                parser.exit(1, f"error: {e}\n")
+            print(f"{tenant.name}: {result['rows']} {table} rows -> {result['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import hmac
+import json
+import asyncio
+import logging
+from urllib.parse import urlsplit, parse_qs
+from config import FAQ_RELOAD_DELAY, FAQ_RELOAD_MAX_DELAY
+from tenants import run_in_sync_pool
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 5  # seconds to receive a whole request
+MAX_REQUEST_LINE = 8192
+MAX_HEADERS = 50
+MAX_BODY = 64 * 1024
+
+HTTP_STATUSES = {
+    202: 'Accepted',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+}
+
+
+class FaqReloader:
+    """
+    debounced background refresh of faq snapshots
+
+    push requests (an edit in the sheet, /reload) only move a timer; the
+    refresh runs in the sync pool once they stop for `delay` seconds, but no
+    later than `max_delay` after the first one, so a burst of edits costs a
+    single read of the sheet. a push during a refresh schedules one more
+    refresh after it. polling callers (an expired or empty snapshot) use
+    ensure(), which starts a refresh right away unless one is already
+    scheduled or running.
+    """
+
+    def __init__(self, refresh, delay=FAQ_RELOAD_DELAY, max_delay=FAQ_RELOAD_MAX_DELAY):
+        self.refresh = refresh  # blocking function refreshing the faq of the current tenant, False on failure
+        self.delay = delay
+        self.max_delay = max_delay
+        self.loop = None
+        self._state = {}  # tenant name -> timer and run state
+        self._tasks = set()
+
+        # push requests and finished refreshes, for /stats
+        self.requested = 0
+        self.reloads = 0
+
+    def start(self):
+        """bind to the running event loop, requests before this are refused"""
+        self.loop = asyncio.get_running_loop()
+
+    def request(self, tenant):
+        """ask for a debounced refresh of the tenant's faq, callable from any thread; False if not started"""
+        return self._call(self._schedule, tenant)
+
+    def ensure(self, tenant):
+        """make sure a refresh of the tenant's faq is under way, callable from any thread; False if not started"""
+        return self._call(self._ensure, tenant)
+
+    def _call(self, callback, tenant):
+        if self.loop is None or self.loop.is_closed():
+            return False
+
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+
+        if on_loop:
+            callback(tenant)
+        else:
+            self.loop.call_soon_threadsafe(callback, tenant)
+        return True
+
+    def _get_state(self, tenant):
+        return self._state.setdefault(tenant.name, {
+            'handle': None, 'deadline': None, 'running': False, 'pending': False, 'retry_at': 0,
+        })
+
+    def _schedule(self, tenant):
+        self.requested += 1
+        state = self._get_state(tenant)
+
+        if state['running']:
+            state['pending'] = True
+            return
+
+        now = self.loop.time()
+        if state['deadline'] is None:
+            state['deadline'] = now + self.max_delay
+        if state['handle'] is not None:
+            state['handle'].cancel()
+
+        at = min(now + self.delay, state['deadline'])
+        state['handle'] = self.loop.call_at(at, self._fire, tenant, state)
+
+    def _ensure(self, tenant):
+        state = self._get_state(tenant)
+        if state['running'] or state['handle'] is not None:
+            return
+
+        at = max(self.loop.time(), state['retry_at'])
+        # later push requests may merge into this refresh but not postpone it
+        state['deadline'] = at
+        state['handle'] = self.loop.call_at(at, self._fire, tenant, state)
+
+    def _fire(self, tenant, state):
+        state['handle'] = None
+        state['deadline'] = None
+        state['running'] = True
+
+        task = self.loop.create_task(self._reload(tenant, state))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _reload(self, tenant, state):
+        ok = False
+        try:
+            ok = await run_in_sync_pool(tenant, self.refresh) is not False
+        except Exception as e:
+            logger.error(f"error reloading faq of {tenant.name}: {e}")
+        finally:
+            state['running'] = False
+            if ok:
+                self.reloads += 1
+            # a failing sheet is retried at most once per delay, not on every update
+            state['retry_at'] = 0 if ok else self.loop.time() + self.delay
+            if state['pending']:
+                state['pending'] = False
+                self._schedule(tenant)
+
+    def get_stats(self):
+        """get counters for monitoring"""
+        return {
+            'requested': self.requested,
+            'reloads': self.reloads,
+            'scheduled': sum(1 for state in self._state.values() if state['handle'] is not None),
+            'running': sum(1 for state in self._state.values() if state['running']),
+        }
+
+
+async def read_request(reader):
+    """read one http request, returns method, path, query and lower-cased headers"""
+    request_line = (await reader.readline()).decode('latin-1').strip()
+    parts = request_line.split()
+    if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+        raise ValueError("malformed request line")
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        if len(headers) >= MAX_HEADERS or ':' not in line:
+            raise ValueError("malformed headers")
+        name, value = line.split(':', 1)
+        headers[name.strip().lower()] = value.strip()
+
+    # drain the body, apps script sends one even if nothing is needed from it
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY:
+        raise ValueError("body too large")
+    if length:
+        await reader.readexactly(length)
+
+    url = urlsplit(parts[1])
+    return parts[0].upper(), url.path, parse_qs(url.query), headers
+
+
+def is_authorized(headers, query, token):
+    """check the shared secret from the X-Reload-Token header, a bearer token or ?token="""
+    supplied = headers.get('x-reload-token') or query.get('token', [''])[0]
+    authorization = headers.get('authorization', '')
+    if not supplied and authorization.lower().startswith('bearer '):
+        supplied = authorization[7:].strip()
+
+    # constant-time comparison, so the token cannot be guessed byte by byte
+    return bool(supplied) and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+
+async def start_reload_server(reloader, tenants, host, port, token):
+    """
+    serve POST /reload (every tenant) and POST /reload/<tenant> for sheet edit triggers
+
+    returns:
+        the asyncio server, to be closed on shutdown
+    """
+    by_name = {tenant.name: tenant for tenant in tenants}
+
+    def route(method, path, query, headers):
+        if not is_authorized(headers, query, token):
+            return 401, {'error': 'invalid token'}
+
+        segments = [segment for segment in path.split('/') if segment]
+        if not segments or segments[0] != 'reload' or len(segments) > 2:
+            return 404, {'error': 'not found'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+
+        if len(segments) == 2:
+            if segments[1] not in by_name:
+                return 404, {'error': f"unknown tenant '{segments[1]}'"}
+            targets = [by_name[segments[1]]]
+        else:
+            targets = tenants
+
+        for tenant in targets:
+            reloader.request(tenant)
+        return 202, {'status': 'scheduled', 'tenants': [tenant.name for tenant in targets]}
+
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(read_request(reader), REQUEST_TIMEOUT)
+            status, body = route(*request)
+        except (ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            status, body = 400, {'error': 'bad request'}
+        except ConnectionError:
+            writer.close()
+            return
+
+        payload = json.dumps(body).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_STATUSES[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + payload
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port, limit=MAX_REQUEST_LINE)
+    logger.info(f"faq reload endpoint listening on {host}:{port}")
+    return server
@@ -0,0 +1,88 @@
+import time
+import logging
+from collections import OrderedDict
+from config import (
+    INBOUND_USER_RATE, INBOUND_USER_BURST,
+    INBOUND_DUPLICATE_WINDOW, INBOUND_MAX_TRACKED_USERS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class InboundGuard:
+    """
+    cheap per-user admission check for incoming updates
+
+    each user gets a token bucket and remembers the last payload they sent;
+    an exact repeat within the duplicate window or an empty bucket rejects
+    the update. state lives in an lru of bounded size, so memory stays flat
+    no matter how many distinct users show up.
+    """
+
+    def __init__(self, rate=INBOUND_USER_RATE, burst=INBOUND_USER_BURST,
+                 duplicate_window=INBOUND_DUPLICATE_WINDOW, max_users=INBOUND_MAX_TRACKED_USERS):
+        self.rate = rate
+        self.burst = burst
+        self.duplicate_window = duplicate_window
+        self.max_users = max_users
+
+        # user_id -> [tokens, last_refill, last_payload, last_payload_time]
+        self._users = OrderedDict()
+
+        # admission outcomes for /stats
+        self.allowed = 0
+        self.duplicates = 0
+        self.limited = 0
+
+    def allow(self, user_id, payload=None):
+        """check if an update from the user should be processed"""
+        now = time.monotonic()
+
+        state = self._users.get(user_id)
+        if state is None:
+            state = [float(self.burst), now, None, 0.0]
+            self._users[user_id] = state
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+
+        # drop exact repeats, e.g. double taps or replayed callback data
+        if payload is not None and payload == state[2] and now - state[3] < self.duplicate_window:
+            self.duplicates += 1
+            return False
+
+        # refill and take a token
+        state[0] = min(self.burst, state[0] + (now - state[1]) * self.rate)
+        state[1] = now
+        if state[0] < 1:
+            self.limited += 1
+            return False
+
+        state[0] -= 1
+        state[2] = payload
+        state[3] = now
+        self.allowed += 1
+        return True
+
+    def get_stats(self):
+        """get counters for monitoring"""
+        return {
+            'allowed': self.allowed,
+            'duplicates': self.duplicates,
+            'limited': self.limited,
+            'tracked_users': len(self._users),
+        }
+
+
+# shared guard for all handlers
+inbound_guard = None
+
+
+def get_inbound_guard():
+    """Get the shared inbound guard"""
+    global inbound_guard
+
+    if inbound_guard is None:
+        inbound_guard = InboundGuard()
+    return inbound_guard
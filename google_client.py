@@ -1,15 +1,8 @@
-import os
 import logging
 import time
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from dotenv import load_dotenv
-load_dotenv()
-# setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+import threading
+from config import CREDENTIALS_FILE, SHEET_ROW_BLOCK
+
 logger = logging.getLogger(__name__)
 
 # google sheets credentials
@@ -17,19 +10,21 @@ SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
     'https://www.googleapis.com/auth/drive'
 ]
-SPREADSHEET_ID = os.environ.get('SPREADSHEET_ID')
-CREDENTIALS_FILE = 'credentials.json'
-USERS_SHEET_NAME = os.environ.get('USERS_SHEET_NAME', 'Users')
-RATINGS_SHEET_NAME = os.environ.get('RATINGS_SHEET_NAME', 'Ratings')
 
-# reusable sheets client
+# reusable sheets client, one for all tenants and sync threads
 sheets_client = None
 last_client_refresh = 0
 CLIENT_REFRESH_INTERVAL = 1800  # refresh client every 30 minutes
+client_lock = threading.Lock()
 
 
 def get_sheets_client():
     """Get and reuse gspread client to avoid repeated authorization"""
+    with client_lock:
+        return _get_sheets_client()
+
+
+def _get_sheets_client():
     global sheets_client, last_client_refresh
 
     current_time = time.time()
@@ -44,8 +39,12 @@ def get_sheets_client():
             # token expired or other error, will reinitialize
             pass
 
-    # initialize new client
+    # initialize new client, the google stack is imported on first use
+    # so that bot startup doesn't pay for it
     try:
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
         creds = ServiceAccountCredentials.from_json_keyfile_name(CREDENTIALS_FILE, SCOPES)
         sheets_client = gspread.authorize(creds)
         last_client_refresh = current_time
@@ -56,8 +55,10 @@ def get_sheets_client():
         return None
 
 
-def ensure_sheet_exists(spreadsheet, sheet_name, headers):
-    """ensure that a sheet exists with the given headers"""
+def ensure_sheet_exists(spreadsheet, sheet_name, headers, rows=SHEET_ROW_BLOCK):
+    """ensure that a sheet exists with the given headers, new sheets get a block of empty rows"""
+    import gspread
+
     try:
         # try to get the sheet
         sheet = spreadsheet.worksheet(sheet_name)
@@ -72,7 +73,7 @@ def ensure_sheet_exists(spreadsheet, sheet_name, headers):
         return sheet
     except gspread.exceptions.WorksheetNotFound:
         # create new sheet
-        sheet = spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=len(headers))
+        sheet = spreadsheet.add_worksheet(title=sheet_name, rows=rows, cols=len(headers))
 
         # add header row
         sheet.append_row(headers)
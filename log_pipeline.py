@@ -0,0 +1,138 @@
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+MAX_TRACKED_TEMPLATES = 1000  # rate limit state is reset once this many distinct messages were seen
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    hand records to the listener thread without ever blocking the caller
+
+    only the message is rendered in the calling thread, formatting and
+    writing happen in the listener. when the queue is full the record is
+    dropped and counted instead of waiting for a slow log consumer.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # render the message now, the arguments may change after the call returns
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    token bucket per message template for records below ERROR
+
+    records are keyed by logger and unformatted message, so hot-path calls
+    must use %-style arguments rather than f-strings to share a bucket. the
+    next record that passes carries the number suppressed before it.
+    """
+
+    def __init__(self, rate, burst):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # (logger, template) -> [tokens, last update, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= MAX_TRACKED_TEMPLATES:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [self.burst, now, 0]
+
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """one json object per line, ready for the docker json-file driver and log collectors"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        suppressed = getattr(record, 'suppressed', None)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SuppressedCountFormatter(logging.Formatter):
+    """plain text format that notes how many similar records the rate limit dropped"""
+
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', None)
+        if suppressed:
+            text += f" ({suppressed} similar messages suppressed)"
+        return text
+
+
+def start_queue_logging(level, text_format, json_output, queue_size, rate, burst):
+    """
+    route root logging through a bounded queue to a background listener
+
+    returns:
+        the listener, to be stopped on shutdown so queued records get written
+    """
+    log_queue = queue.Queue(queue_size)
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if json_output else SuppressedCountFormatter(text_format))
+
+    handler = DroppingQueueHandler(log_queue)
+    if rate > 0:
+        handler.addFilter(RateLimitFilter(rate, burst))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -1,28 +1,31 @@
 #!/usr/bin/env python
 import time
 import logging
+from config import setup_logging
+from database import init_db
 from sync import perform_sync_if_needed
-from dotenv import load_dotenv
+from retention import run_retention_if_needed
+from tenants import get_tenants, run_for_tenant
 
-# load environment variables
-load_dotenv()
-
-# setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 
 def main():
     """run periodic sync as a standalone script"""
+    setup_logging()
     logger.info("starting periodic sync service")
 
+    # initialize databases of every tenant
+    tenants = get_tenants()
+    for tenant in tenants:
+        run_for_tenant(tenant, init_db)
+
     try:
         while True:
             logger.info("running sync...")
-            perform_sync_if_needed()
+            for tenant in tenants:
+                run_for_tenant(tenant, perform_sync_if_needed)
+                run_for_tenant(tenant, run_retention_if_needed)
 
             # wait for next sync cycle
             logger.info("sleeping for 60 seconds before next sync")
@@ -0,0 +1,224 @@
+import os
+import io
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import logging
+import functools
+import threading
+import traceback
+from datetime import datetime
+from config import PROFILE_DIR, LOOP_LAG_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_TOP_FUNCTIONS = 30
+
+
+class Profiler:
+    """
+    admin-triggered profiling for a bounded window
+
+    while a window is open the event loop thread runs under cProfile, so the
+    dump shows where handler time goes (faq lookups, sqlite, keyboard
+    building), and functions wrapped with profiled() record their wall time.
+    wrapped blocking functions running in worker threads, like a sync cycle,
+    get a profile dump per call. outside a window a wrapped call costs one
+    clock comparison.
+    """
+
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        self.until = 0
+        self.session = None
+        self.loop_profile = None
+        self.timings = {}  # name -> [calls, total seconds, max seconds]
+        self.dumps = []
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return time.monotonic() < self.until
+
+    def start(self, seconds):
+        """open a window, must be called from the event loop thread"""
+        if self.loop_profile is not None:
+            return False
+
+        self.session = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.timings = {}
+        self.dumps = []
+        self.loop_profile = cProfile.Profile()
+        self.loop_profile.enable()
+        self.until = time.monotonic() + seconds
+
+        logger.info(f"profiling for {seconds}s, dumps go to {self.directory}")
+        return True
+
+    def stop(self):
+        """close the window and write the loop profile and a text summary, returns the summary path"""
+        if self.loop_profile is None:
+            return None
+
+        loop_profile = self.loop_profile
+        self.until = 0
+        try:
+            loop_profile.disable()
+            os.makedirs(self.directory, exist_ok=True)
+
+            loop_path = os.path.join(self.directory, f"loop_{self.session}.prof")
+            loop_profile.dump_stats(loop_path)
+
+            # readable summary: wall time of wrapped calls, then the hottest loop functions
+            output = io.StringIO()
+            output.write(f"profile {self.session}\n\nwrapped calls (calls, total s, max s):\n")
+            with self._lock:
+                for name, (calls, total, longest) in sorted(self.timings.items(), key=lambda item: -item[1][1]):
+                    output.write(f"  {name}: {calls}, {total:.3f}, {longest:.3f}\n")
+                dumps = [loop_path] + self.dumps
+            output.write("\ndumps:\n" + "".join(f"  {path}\n" for path in dumps) + "\n")
+            pstats.Stats(loop_profile, stream=output).sort_stats('cumulative').print_stats(SUMMARY_TOP_FUNCTIONS)
+
+            summary_path = os.path.join(self.directory, f"summary_{self.session}.txt")
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                f.write(output.getvalue())
+        finally:
+            # a failed dump, e.g. on a full disk, must not keep the window looking open
+            self.loop_profile = None
+
+        logger.info(f"profiling finished, summary in {summary_path}")
+        return summary_path
+
+    def record(self, name, elapsed):
+        """add the wall time of one wrapped call"""
+        with self._lock:
+            timing = self.timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+
+    def run_profiled(self, name, func, *args, **kwargs):
+        """call a blocking function under its own profiler, for worker threads"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # interpreters with a single process-wide profiler already cover this thread
+            profile = None
+
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter() - started)
+            if profile is not None:
+                profile.disable()
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f"{name}_{self.session}_{time.time_ns()}.prof")
+                profile.dump_stats(path)
+                with self._lock:
+                    self.dumps.append(path)
+
+
+def profiled(name):
+    """wrap a handler or blocking function so profiling windows capture it"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                profiler = get_profiler()
+                if not profiler.active:
+                    return await func(*args, **kwargs)
+
+                # the loop profile already covers the body, only the wall time is added here
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    profiler.record(name, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = get_profiler()
+            if not profiler.active:
+                return func(*args, **kwargs)
+            return profiler.run_profiled(name, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LoopWatchdog:
+    """
+    log what the event loop is doing when a callback blocks it
+
+    the loop bumps a heartbeat every fraction of the threshold; a background
+    thread checks it and, once the loop has been stuck longer than the
+    threshold, logs the current stack of the loop thread, i.e. the code that
+    is blocking it.
+    """
+
+    def __init__(self, threshold=LOOP_LAG_THRESHOLD):
+        self.threshold = threshold
+        self.interval = threshold / 4
+        self.loop = None
+        self.loop_thread_id = None
+        self.last_beat = 0
+        self.reported = False
+        self.stalls = 0
+        self._handle = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """start watching the running loop, must be called from the loop thread"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._handle = self.loop.call_later(self.interval, self._beat)
+
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+
+    def _beat(self):
+        now = time.monotonic()
+        lag = now - self.last_beat - self.interval
+        if lag > self.threshold:
+            logger.warning(f"event loop was blocked for {lag:.2f}s")
+
+        self.last_beat = now
+        self.reported = False
+        self._handle = self.loop.call_later(self.interval, self._beat)
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            stalled = time.monotonic() - self.last_beat - self.interval
+            if stalled <= self.threshold or self.reported:
+                continue
+
+            # report each stall once, with the stack that is holding the loop
+            self.reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else 'unavailable\n'
+            logger.warning(f"event loop blocked for {stalled:.2f}s, loop thread stack:\n{stack}")
+
+
+# shared profiler for every handler and tenant
+profiler = None
+
+
+def get_profiler():
+    """Get the shared profiler"""
+    global profiler
+
+    if profiler is None:
+        profiler = Profiler()
+    return profiler
@@ -0,0 +1,156 @@
+import os
+import gzip
+import json
+import time
+import logging
+from datetime import datetime, timedelta
+from config import (
+    RATINGS_RETENTION_DAYS, USERS_RETENTION_DAYS,
+    RETENTION_INTERVAL, RETENTION_BATCH_SIZE, VACUUM_PAGES
+)
+from database import (
+    ARCHIVABLE_TABLES, get_archivable_rows, delete_archived_rows,
+    enable_incremental_vacuum, compact_db, get_db_stats,
+    get_setting, set_setting
+)
+from tenants import get_current_tenant
+
+logger = logging.getLogger(__name__)
+
+
+def get_partition_path(table, day):
+    """archive file for one table and day, e.g. archive/ratings/2026/10/ratings_2026-10-01.jsonl.gz"""
+    year, month, _ = day.split('-')
+    return os.path.join(get_current_tenant().archive_dir, table, year, month, f"{table}_{day}.jsonl.gz")
+
+
+def write_archive_batch(table, rows):
+    """append rows to their daily partitions, durably, before they get deleted"""
+    _, date_column = ARCHIVABLE_TABLES[table]
+
+    partitions = {}
+    for row in rows:
+        day = (row[date_column] or '1970-01-01')[:10]
+        partitions.setdefault(day, []).append(row)
+
+    for day, day_rows in partitions.items():
+        path = get_partition_path(table, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # each batch becomes one more gzip member, readers see a single stream
+        with open(path, 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                for row in day_rows:
+                    archive.write((json.dumps(row, ensure_ascii=False) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def archive_table(table, days):
+    """
+    move synced rows older than the given number of days to archive files
+
+    only synced rows are archived, so nothing that still has to reach the
+    sheets is lost. rating counters in article_stats are not touched, and
+    the latest vote per user and article stays in rating_votes, so voting
+    again after the old row was archived doesn't change the counters twice.
+    """
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    key_column, _ = ARCHIVABLE_TABLES[table]
+
+    archived = 0
+    while True:
+        rows = get_archivable_rows(table, cutoff, RETENTION_BATCH_SIZE)
+        if not rows:
+            break
+
+        write_archive_batch(table, rows)
+        archived += delete_archived_rows(table, [row[key_column] for row in rows], cutoff)
+
+        if len(rows) < RETENTION_BATCH_SIZE:
+            break
+
+    if archived:
+        logger.info(f"archived {archived} {table} rows older than {days} days")
+    return archived
+
+
+def retention_enabled():
+    """check if any table has a retention period"""
+    return RATINGS_RETENTION_DAYS > 0 or USERS_RETENTION_DAYS > 0
+
+
+def prepare_retention():
+    """
+    switch the database to incremental auto-vacuum if retention is enabled
+
+    the switch rebuilds the whole database once and holds the write lock
+    meanwhile, so it runs at startup before the bot takes updates rather
+    than in the first retention pass.
+    """
+    if not retention_enabled():
+        return
+
+    try:
+        started = time.monotonic()
+        if enable_incremental_vacuum():
+            logger.info(f"database of {get_current_tenant().name} rebuilt for incremental auto-vacuum "
+                        f"in {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        logger.error(f"error switching database to incremental auto-vacuum: {e}")
+
+
+def run_retention():
+    """archive old rows of every table with retention enabled and compact the database"""
+    retention = {'ratings': RATINGS_RETENTION_DAYS, 'users': USERS_RETENTION_DAYS}
+
+    archived = 0
+    for table, days in retention.items():
+        if days > 0:
+            try:
+                archived += archive_table(table, days)
+            except Exception as e:
+                logger.error(f"error archiving {table}: {e}")
+
+    # compact a bounded number of pages per run instead of a full VACUUM,
+    # prepare_retention switched the database to incremental auto-vacuum at startup
+    try:
+        freed_pages = compact_db(VACUUM_PAGES)
+        if freed_pages:
+            logger.info(f"returned {freed_pages} free database pages to the filesystem")
+    except Exception as e:
+        logger.error(f"error compacting database: {e}")
+
+    set_setting('last_retention_run', str(int(time.time())))
+    return archived
+
+
+def run_retention_if_needed():
+    """check if retention is due and run it, nothing is archived or compacted while retention is disabled"""
+    if not retention_enabled():
+        return
+
+    last_run = int(get_setting('last_retention_run') or '0')
+    if int(time.time()) - last_run >= RETENTION_INTERVAL:
+        run_retention()
+
+
+def get_archive_stats():
+    """get archive size and archived row counts per table, plus live database size"""
+    stats = {'database': get_db_stats()}
+
+    for table in ARCHIVABLE_TABLES:
+        files = 0
+        size = 0
+        for root, _, names in os.walk(os.path.join(get_current_tenant().archive_dir, table)):
+            for name in names:
+                files += 1
+                size += os.path.getsize(os.path.join(root, name))
+
+        stats[table] = {
+            'files': files,
+            'size_bytes': size,
+            'archived_rows': int(get_setting(f'archived_{table}_rows') or '0'),
+        }
+
+    return stats
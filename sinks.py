@@ -0,0 +1,470 @@
+import os
+import re
+import csv
+import json
+import sqlite3
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from config import SYNC_SINKS, SHEET_ROW_BLOCK, SHEET_MAX_ROWS, SHEET_CELL_LIMIT, SHEET_ROTATE_RATIO
+from google_client import get_sheets_client, ensure_sheet_exists
+from database import get_sink_progress, add_sink_progress, clear_sink_progress
+from tenants import get_current_tenant
+
+logger = logging.getLogger(__name__)
+
+USERS_HEADERS = [
+    "User ID", "Username", "First Name", "Last Name",
+    "Language Code", "Is Bot", "Chat ID", "Chat Type",
+    "First Seen", "Last Seen"
+]
+RATINGS_HEADERS = [
+    "Timestamp", "User ID", "Username", "Category",
+    "Article ID", "Article Title", "Rating"
+]
+SUMMARY_HEADERS = [
+    "Category", "Article ID", "Article Title",
+    "Up", "Down", "Total", "Helpful %", "Updated"
+]
+
+
+def user_row(user):
+    """format a user as a row of USERS_HEADERS"""
+    return [
+        str(user['user_id']),
+        user['username'] or "",
+        user['first_name'] or "",
+        user['last_name'] or "",
+        user['language_code'] or "",
+        "Yes" if user['is_bot'] else "No",
+        str(user['chat_id']) if user['chat_id'] else "",
+        user['chat_type'] or "",
+        user['first_seen'],
+        user['last_seen']
+    ]
+
+
+def rating_row(rating):
+    """format a rating as a row of RATINGS_HEADERS"""
+    return [
+        rating['timestamp'],
+        str(rating['user_id']),
+        rating.get('username', "Unknown"),
+        rating['category'],
+        rating['article_id'],
+        rating['article_title'],
+        rating['rating']
+    ]
+
+
+def summary_row(stat):
+    """format article counters as a row of SUMMARY_HEADERS"""
+    total = stat['up_count'] + stat['down_count']
+    return [
+        stat['category'],
+        stat['article_id'],
+        stat['article_title'] or "",
+        stat['up_count'],
+        stat['down_count'],
+        total,
+        round(100 * stat['up_count'] / total, 1) if total else 0,
+        stat['updated_at'] or ""
+    ]
+
+
+class Sink(ABC):
+    """
+    destination for synced data
+
+    each write gets a batch and either stores all of it or raises. every
+    sink keeps its own progress, so after a failure only the sinks that
+    failed are sent the rows again; a sink sees a row twice only when a
+    sync is interrupted between the write and recording it.
+    """
+
+    name = 'sink'
+
+    @abstractmethod
+    def write_users(self, users):
+        """store a batch of users"""
+
+    @abstractmethod
+    def write_ratings(self, ratings):
+        """store a batch of ratings"""
+
+    @abstractmethod
+    def write_summary(self, stats):
+        """store the current per-article counters, all articles at once"""
+
+
+class SheetsSink(Sink):
+    """
+    the tenant's google spreadsheet, upserting users and ratings by key
+
+    new rows go to explicit ranges below the used part of the sheet and the
+    grid grows a block of SHEET_ROW_BLOCK rows at a time, so appends don't
+    resize the sheet on every sync. a spreadsheet holds at most
+    SHEET_CELL_LIMIT cells; when the ratings sheet passes SHEET_MAX_ROWS or
+    the spreadsheet nears the limit, the full sheet is trimmed to its used
+    rows and writing continues in a sheet named after the current month.
+    ratings are only deduplicated within the active sheet.
+    """
+
+    name = 'sheets'
+
+    def _open_spreadsheet(self):
+        client = get_sheets_client()
+        if not client:
+            raise RuntimeError("failed to get google sheets client")
+
+        return client.open_by_key(get_current_tenant().spreadsheet_id)
+
+    def _cells_used(self, spreadsheet):
+        """cells allocated by every sheet of the spreadsheet, from one metadata request"""
+        worksheets = spreadsheet.worksheets()
+        return worksheets, sum(ws.row_count * ws.col_count for ws in worksheets)
+
+    def _write_rows(self, sheet, first_row, rows, cells_used):
+        """write rows starting at first_row, growing the grid by whole blocks when needed"""
+        last_row = first_row + len(rows) - 1
+        if sheet.row_count < last_row:
+            grow = max(SHEET_ROW_BLOCK, last_row - sheet.row_count)
+            if cells_used + grow * sheet.col_count > SHEET_CELL_LIMIT * SHEET_ROTATE_RATIO:
+                logger.warning(f"spreadsheet uses {cells_used} of {SHEET_CELL_LIMIT} cells, "
+                               f"growing '{sheet.title}' by {grow} rows")
+            sheet.add_rows(grow)
+
+        last_column = chr(ord('A') + len(rows[0]) - 1)
+        sheet.update(range_name=f"A{first_row}:{last_column}{last_row}", values=rows)
+
+    def write_users(self, users):
+        spreadsheet = self._open_spreadsheet()
+        sheet = ensure_sheet_exists(spreadsheet, get_current_tenant().users_sheet_name, USERS_HEADERS)
+
+        # one read of the id column instead of a search per user
+        ids = sheet.col_values(1)
+        row_by_id = {value: i for i, value in enumerate(ids, start=1) if i > 1}
+
+        updates = []
+        appends = []
+        for user in users:
+            row = user_row(user)
+            row_num = row_by_id.get(row[0])
+            if row_num:
+                # first seen stays the same
+                updates.append({'range': f"B{row_num}:H{row_num}", 'values': [row[1:8]]})
+                updates.append({'range': f"J{row_num}", 'values': [[row[9]]]})
+            else:
+                appends.append(row)
+
+        if updates:
+            sheet.batch_update(updates)
+        if appends:
+            _, cells_used = self._cells_used(spreadsheet)
+            self._write_rows(sheet, len(ids) + 1, appends, cells_used)
+
+    def _ratings_sheets(self, worksheets):
+        """ratings sheets of the tenant in creation order: the base sheet and its rotations"""
+        base = get_current_tenant().ratings_sheet_name
+        pattern = re.compile(rf"^{re.escape(base)}(_\d{{4}}_\d{{2}}(_\d+)?)?$")
+        return [ws for ws in worksheets if pattern.match(ws.title)]
+
+    def _rotate_ratings_sheet(self, spreadsheet, worksheets, sheet, used_rows):
+        """trim the full sheet to its used rows and start a sheet for the current period"""
+        if sheet.row_count > used_rows:
+            sheet.resize(rows=used_rows)
+
+        titles = {ws.title for ws in worksheets}
+        period_name = f"{get_current_tenant().ratings_sheet_name}_{datetime.now():%Y_%m}"
+        new_name = period_name
+        suffix = 2
+        while new_name in titles:
+            new_name = f"{period_name}_{suffix}"
+            suffix += 1
+
+        logger.info(f"ratings sheet '{sheet.title}' is full at {used_rows} rows, continuing in '{new_name}'")
+        return ensure_sheet_exists(spreadsheet, new_name, RATINGS_HEADERS)
+
+    def write_ratings(self, ratings):
+        spreadsheet = self._open_spreadsheet()
+        worksheets, cells_used = self._cells_used(spreadsheet)
+
+        ratings_sheets = self._ratings_sheets(worksheets)
+        if ratings_sheets:
+            sheet = ratings_sheets[-1]
+        else:
+            sheet = ensure_sheet_exists(spreadsheet, get_current_tenant().ratings_sheet_name, RATINGS_HEADERS)
+
+        # one read of the key columns (user id, category, article id) for the whole batch
+        user_ids, categories, article_ids = sheet.batch_get(['B:B', 'D:D', 'E:E'])
+        used_rows = max(len(user_ids), 1)
+
+        # roll over before the sheet or the spreadsheet runs out of room; under cell
+        # pressure only a sheet holding at least a block of data is rotated, so a
+        # nearly full spreadsheet doesn't get a new empty sheet on every sync
+        needed_rows = used_rows + len(ratings)
+        grow_cells = 0
+        if needed_rows > sheet.row_count:
+            grow_cells = max(SHEET_ROW_BLOCK, needed_rows - sheet.row_count) * sheet.col_count
+        near_cell_limit = cells_used + grow_cells > SHEET_CELL_LIMIT * SHEET_ROTATE_RATIO
+        if needed_rows > SHEET_MAX_ROWS or (near_cell_limit and used_rows > SHEET_ROW_BLOCK):
+            sheet = self._rotate_ratings_sheet(spreadsheet, worksheets, sheet, used_rows)
+            user_ids, categories, article_ids = [], [], []
+            used_rows = 1
+
+        rows_by_key = {}
+        for i in range(1, len(user_ids)):
+            key = (
+                user_ids[i][0] if user_ids[i] else "",
+                categories[i][0] if i < len(categories) and categories[i] else "",
+                article_ids[i][0] if i < len(article_ids) and article_ids[i] else "",
+            )
+            rows_by_key.setdefault(key, []).append(i + 1)
+
+        updates = []
+        appends = []
+        duplicate_rows = []
+        for rating in ratings:
+            row = rating_row(rating)
+            matching_rows = rows_by_key.get((row[1], row[3], row[4]))
+            if matching_rows:
+                # update the first found row, delete any duplicates
+                row_num = matching_rows[0]
+                updates.append({'range': f"A{row_num}", 'values': [[row[0]]]})
+                updates.append({'range': f"G{row_num}", 'values': [[row[6]]]})
+                duplicate_rows.extend(matching_rows[1:])
+            else:
+                appends.append(row)
+
+        if updates:
+            sheet.batch_update(updates)
+
+        # bottom up, so deleting a row doesn't shift the ones still to delete
+        for row_num in sorted(duplicate_rows, reverse=True):
+            sheet.delete_rows(row_num)
+        used_rows -= len(duplicate_rows)
+
+        if appends:
+            self._write_rows(sheet, used_rows + 1, appends, cells_used)
+
+    def write_summary(self, stats):
+        spreadsheet = self._open_spreadsheet()
+        sheet = ensure_sheet_exists(spreadsheet, get_current_tenant().summary_sheet_name, SUMMARY_HEADERS)
+
+        # build the whole table; articles are never removed from the stats,
+        # so rewriting from the top always covers the previous summary
+        rows = [SUMMARY_HEADERS] + [summary_row(stat) for stat in stats]
+
+        # grow the grid once if needed, then write everything in a single request
+        if sheet.row_count < len(rows):
+            sheet.add_rows(len(rows) - sheet.row_count)
+        sheet.update(range_name=f"A1:H{len(rows)}", values=rows)
+
+
+class FileSink(Sink):
+    """append-only local files, one per table, in jsonl or csv"""
+
+    def __init__(self, directory, fmt='jsonl'):
+        self.directory = directory
+        self.fmt = fmt
+        self.name = f"{fmt}:{directory}"
+
+    def _append(self, table, headers, rows, records):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{table}.{self.fmt}")
+
+        if self.fmt == 'csv':
+            is_new = not os.path.exists(path)
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if is_new:
+                    writer.writerow(headers)
+                writer.writerows(rows)
+        else:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+
+    def write_users(self, users):
+        self._append('users', USERS_HEADERS, [user_row(u) for u in users], users)
+
+    def write_ratings(self, ratings):
+        self._append('ratings', RATINGS_HEADERS, [rating_row(r) for r in ratings], ratings)
+
+    def write_summary(self, stats):
+        # append a timestamped snapshot, the latest one per article wins
+        synced_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._append('summary', ["Synced At"] + SUMMARY_HEADERS,
+                     [[synced_at] + summary_row(s) for s in stats],
+                     [dict(s, synced_at=synced_at) for s in stats])
+
+
+class SQLSink(Sink):
+    """
+    tables in another sql database, upserted by key
+
+    connect is any db-api factory whose driver understands sqlite-style
+    upserts and the given placeholder; by default a local sqlite file.
+    """
+
+    def __init__(self, database, connect=sqlite3.connect, placeholder='?'):
+        self.database = database
+        self.connect = connect
+        self.placeholder = placeholder
+        self.name = f"sql:{database}"
+        self.schema_ready = False
+
+    def _execute(self, statements):
+        conn = self.connect(self.database)
+        try:
+            cursor = conn.cursor()
+            if not self.schema_ready:
+                self._create_schema(cursor)
+            for sql, params in statements:
+                cursor.executemany(sql.replace('?', self.placeholder), params)
+            conn.commit()
+            self.schema_ready = True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _create_schema(self, cursor):
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id BIGINT PRIMARY KEY,
+            username TEXT, first_name TEXT, last_name TEXT, language_code TEXT,
+            is_bot INTEGER, chat_id BIGINT, chat_type TEXT,
+            first_seen TEXT, last_seen TEXT
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ratings (
+            user_id BIGINT, category TEXT, article_id TEXT,
+            article_title TEXT, rating TEXT, timestamp TEXT,
+            PRIMARY KEY (user_id, category, article_id)
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_summary (
+            category TEXT, article_id TEXT, article_title TEXT,
+            up_count INTEGER, down_count INTEGER, updated_at TEXT,
+            PRIMARY KEY (category, article_id)
+        )
+        ''')
+
+    def write_users(self, users):
+        self._execute([('''
+        INSERT INTO users
+        (user_id, username, first_name, last_name, language_code, is_bot,
+         chat_id, chat_type, first_seen, last_seen)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = excluded.username, first_name = excluded.first_name,
+            last_name = excluded.last_name, language_code = excluded.language_code,
+            is_bot = excluded.is_bot, chat_id = excluded.chat_id,
+            chat_type = excluded.chat_type, last_seen = excluded.last_seen
+        ''', [(
+            u['user_id'], u['username'], u['first_name'], u['last_name'], u['language_code'],
+            u['is_bot'], u['chat_id'], u['chat_type'], u['first_seen'], u['last_seen']
+        ) for u in users])])
+
+    def write_ratings(self, ratings):
+        self._execute([('''
+        INSERT INTO ratings
+        (user_id, category, article_id, article_title, rating, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, category, article_id) DO UPDATE SET
+            article_title = excluded.article_title, rating = excluded.rating,
+            timestamp = excluded.timestamp
+        ''', [(
+            r['user_id'], r['category'], r['article_id'], r['article_title'], r['rating'], r['timestamp']
+        ) for r in ratings])])
+
+    def write_summary(self, stats):
+        self._execute([('''
+        INSERT INTO article_summary
+        (category, article_id, article_title, up_count, down_count, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (category, article_id) DO UPDATE SET
+            article_title = excluded.article_title, up_count = excluded.up_count,
+            down_count = excluded.down_count, updated_at = excluded.updated_at
+        ''', [(
+            s['category'], s['article_id'], s['article_title'], s['up_count'], s['down_count'], s['updated_at']
+        ) for s in stats])])
+
+
+def create_sink(spec):
+    """build a sink from its spec: 'sheets', 'jsonl:<dir>', 'csv:<dir>' or 'sql:<sqlite file>'"""
+    kind, _, target = spec.strip().partition(':')
+    target = target.format(tenant=get_current_tenant().name)
+
+    if kind == 'sheets':
+        return SheetsSink()
+    if kind in ('jsonl', 'csv') and target:
+        return FileSink(target, kind)
+    if kind == 'sql' and target:
+        return SQLSink(target)
+    raise ValueError(f"unknown sync sink '{spec}'")
+
+
+# sinks per tenant, built on first use
+sinks = {}
+
+
+def get_sinks():
+    """Get the sinks of the current tenant"""
+    tenant = get_current_tenant()
+
+    if tenant.name not in sinks:
+        specs = tenant.sync_sinks or SYNC_SINKS
+        sinks[tenant.name] = [create_sink(spec) for spec in specs.split(',') if spec.strip()]
+    return sinks[tenant.name]
+
+
+# tables written as one snapshot, a sink missing any of their rows gets all of them
+SNAPSHOT_TABLES = {'summary'}
+
+
+def row_hash(row):
+    """hash of a row's content, a changed row is a new row for sink progress"""
+    return hashlib.sha1(json.dumps(row, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+def write_to_sinks(table, rows):
+    """
+    write a batch to every sink of the current tenant that doesn't have it yet
+
+    while one sink fails, the sinks that stored the batch record its rows
+    and the next sync only sends them rows they are missing; once every
+    sink has the batch the record is cleared.
+
+    returns:
+        True if every sink stored the batch
+    """
+    hashes = [row_hash(row) for row in rows]
+
+    ok = True
+    stored_by = []
+    for sink in get_sinks():
+        stored = get_sink_progress(sink.name, table)
+        missing = [row for row, digest in zip(rows, hashes) if digest not in stored]
+        if not missing:
+            continue
+        if table in SNAPSHOT_TABLES:
+            missing = rows
+
+        try:
+            getattr(sink, f"write_{table}")(missing)
+            stored_by.append(sink)
+        except Exception as e:
+            logger.error(f"error writing {len(missing)} {table} rows to {sink.name}: {e}")
+            ok = False
+
+    if ok:
+        clear_sink_progress(table)
+    else:
+        for sink in stored_by:
+            add_sink_progress(sink.name, table, hashes)
+    return ok
@@ -0,0 +1,83 @@
+import time
+import socket
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# imported first by the entry points, so this approximates process start
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """collect durations of startup phases and report them once the bot is ready"""
+
+    def __init__(self, started=PROCESS_START):
+        self.started = started
+        self.phases = []
+        self._open = {}
+
+    def record(self, name, started):
+        """record a phase that started at the given perf_counter value and ends now"""
+        self.phases.append((name, time.perf_counter() - started))
+
+    def begin(self, name):
+        """start timing a phase that ends in another callback"""
+        self._open[name] = time.perf_counter()
+
+    def end(self, name):
+        """finish a phase started with begin"""
+        started = self._open.pop(name, None)
+        if started is not None:
+            self.record(name, started)
+
+    @contextmanager
+    def phase(self, name):
+        """time a block of code as one phase"""
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def report(self):
+        """log the total startup time with a breakdown by phase"""
+        total = time.perf_counter() - self.started
+        breakdown = ", ".join(f"{name} {duration:.2f}s" for name, duration in self.phases)
+        logger.info(f"startup finished in {total:.2f}s ({breakdown})")
+        return total
+
+
+def wait_until_ready(name, check, timeout, interval=0.2, max_interval=2.0):
+    """
+    poll a readiness check with exponential backoff
+
+    args:
+        name: dependency name for logging
+        check: callable returning a truthy value or raising when not ready
+        timeout: seconds to keep trying before giving up
+    returns:
+        True if the dependency became ready within the timeout
+    """
+    deadline = time.monotonic() + timeout
+    last_error = None
+
+    while True:
+        try:
+            if check():
+                return True
+        except Exception as e:
+            last_error = e
+
+        if time.monotonic() + interval > deadline:
+            logger.warning(f"{name} not ready after {timeout:.0f}s, continuing anyway: {last_error}")
+            return False
+
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
+
+
+def can_connect(host, port=443, timeout=2.0):
+    """readiness check: resolve the host and open a tcp connection to it"""
+    with socket.create_connection((host, port), timeout=timeout):
+        return True
@@ -0,0 +1,166 @@
+import os
+import json
+import asyncio
+import logging
+import functools
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    TENANTS_FILE, SYNC_WORKERS, TELEGRAM_TOKEN, ADMIN_IDS, SPREADSHEET_ID, DB_FILE,
+    USERS_SHEET_NAME, RATINGS_SHEET_NAME, SUMMARY_SHEET_NAME, ARCHIVE_DIR, EXPORT_DIR,
+    FAQ_LANGUAGES, FAQ_DEFAULT_LANGUAGE
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Tenant:
+    """
+    one bot served by this process: its token, storage and sheet settings,
+    plus its own in-memory faq snapshots, one per language
+
+    everything else (event loop, google client, outbound throttler and
+    sync workers) is shared between tenants.
+    """
+
+    def __init__(self, name, token, spreadsheet_id, db_file, archive_dir, export_dir, admin_ids=(),
+                 users_sheet_name=USERS_SHEET_NAME, ratings_sheet_name=RATINGS_SHEET_NAME,
+                 summary_sheet_name=SUMMARY_SHEET_NAME, sync_sinks=None,
+                 faq_languages=FAQ_LANGUAGES, default_language=FAQ_DEFAULT_LANGUAGE):
+        self.name = name
+        self.token = token
+        self.spreadsheet_id = spreadsheet_id
+        self.db_file = db_file
+        self.archive_dir = archive_dir
+        self.export_dir = export_dir
+        self.admin_ids = set(admin_ids)
+        self.users_sheet_name = users_sheet_name
+        self.ratings_sheet_name = ratings_sheet_name
+        self.summary_sheet_name = summary_sheet_name
+        self.sync_sinks = sync_sinks  # SYNC_SINKS spec, None uses the global one
+
+        # language -> faq tab title, None reads the first sheet
+        self.faq_languages = {language.lower(): title for language, title in faq_languages.items()}
+        self.default_language = default_language.lower()
+        if not self.faq_languages:
+            self.faq_languages = {self.default_language: None}
+        elif self.default_language not in self.faq_languages:
+            self.default_language = next(iter(self.faq_languages))
+
+        # faq snapshots, all refreshed together by bot.refresh_faq_data;
+        # language -> {'data': categories with articles, 'links': deep link payload -> (category, article index)}
+        self.faq_snapshots = {}
+        self.faq_hashes = {}  # language -> hash of the tab contents the snapshot was built from
+        self.faq_updated_at = 0
+
+    def __repr__(self):
+        return f"Tenant({self.name!r})"
+
+
+def tenant_from_dict(data):
+    """build a tenant from one entry of the tenants file, defaulting to the global settings"""
+    name = data['name']
+    data_dir = os.path.dirname(DB_FILE)
+
+    return Tenant(
+        name=name,
+        token=data['token'],
+        spreadsheet_id=data['spreadsheet_id'],
+        db_file=data.get('db_file', os.path.join(data_dir, f"bot_data_{name}.db")),
+        archive_dir=data.get('archive_dir', os.path.join(ARCHIVE_DIR, name)),
+        export_dir=data.get('export_dir', os.path.join(EXPORT_DIR, name)),
+        admin_ids=data.get('admin_ids', ADMIN_IDS),
+        users_sheet_name=data.get('users_sheet_name', USERS_SHEET_NAME),
+        ratings_sheet_name=data.get('ratings_sheet_name', RATINGS_SHEET_NAME),
+        summary_sheet_name=data.get('summary_sheet_name', SUMMARY_SHEET_NAME),
+        sync_sinks=data.get('sync_sinks'),
+        faq_languages=data.get('faq_languages', FAQ_LANGUAGES),
+        default_language=data.get('default_language', FAQ_DEFAULT_LANGUAGE),
+    )
+
+
+# tenant registry
+tenants = None
+default_tenant = None
+current_tenant = contextvars.ContextVar('current_tenant', default=None)
+
+
+def get_default_tenant():
+    """Get the tenant configured by the plain environment variables"""
+    global default_tenant
+
+    if default_tenant is None:
+        default_tenant = Tenant(
+            name='default',
+            token=TELEGRAM_TOKEN,
+            spreadsheet_id=SPREADSHEET_ID,
+            db_file=DB_FILE,
+            archive_dir=ARCHIVE_DIR,
+            export_dir=EXPORT_DIR,
+            admin_ids=ADMIN_IDS,
+        )
+    return default_tenant
+
+
+def get_tenants():
+    """Get all tenants, from TENANTS_FILE if set, otherwise the single default tenant"""
+    global tenants
+
+    if tenants is None:
+        if TENANTS_FILE:
+            with open(TENANTS_FILE, encoding='utf-8') as f:
+                tenants = [tenant_from_dict(entry) for entry in json.load(f)]
+            logger.info(f"loaded {len(tenants)} tenants from {TENANTS_FILE}")
+        else:
+            tenants = [get_default_tenant()]
+    return tenants
+
+
+def get_current_tenant():
+    """Get the tenant of the code that is running now, the default tenant outside any"""
+    return current_tenant.get() or get_default_tenant()
+
+
+@contextmanager
+def activate(tenant):
+    """run a block of code on behalf of the tenant"""
+    token = current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        current_tenant.reset(token)
+
+
+def bind(tenant, callback):
+    """wrap an async handler so it always runs on behalf of the tenant"""
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        with activate(tenant):
+            return await callback(*args, **kwargs)
+    return wrapper
+
+
+def run_for_tenant(tenant, func, *args):
+    """call a blocking function on behalf of the tenant, used in worker threads"""
+    with activate(tenant):
+        return func(*args)
+
+
+# sync workers shared by all tenants
+sync_pool = None
+
+
+def get_sync_pool():
+    """Get the shared thread pool for blocking sync work"""
+    global sync_pool
+
+    if sync_pool is None:
+        sync_pool = ThreadPoolExecutor(max_workers=SYNC_WORKERS, thread_name_prefix='sync')
+    return sync_pool
+
+
+async def run_in_sync_pool(tenant, func, *args):
+    """run a blocking function for the tenant in the shared pool without blocking the loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_sync_pool(), run_for_tenant, tenant, func, *args)
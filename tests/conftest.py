@@ -0,0 +1,25 @@
+import os
+import sys
+import pytest
+
+# the bot modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tenants import Tenant, activate
+from database import init_db
+
+
+@pytest.fixture
+def tenant(tmp_path):
+    """a tenant with its own empty database in a temporary directory, active during the test"""
+    tenant = Tenant(
+        name='test',
+        token='test-token',
+        spreadsheet_id=None,
+        db_file=str(tmp_path / 'bot_data.db'),
+        archive_dir=str(tmp_path / 'archive'),
+        export_dir=str(tmp_path / 'exports'),
+    )
+    with activate(tenant):
+        init_db()
+        yield tenant
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from telegram.error import Forbidden
+from broadcast import run_broadcast
+from database import get_db_connection, save_user, create_broadcast, get_broadcast
+from retention import archive_table
+from throttler import OutboundThrottler
+
+USERS = 30
+BLOCKED_USERS = {3, 7, 25}
+
+
+class FakeBot:
+    """stands in for the telegram bot: records messages, users in blocked raise Forbidden"""
+
+    def __init__(self, blocked=(), hang_after=None):
+        self.blocked = set(blocked)
+        self.hang_after = hang_after  # sends after this many messages never finish
+        self.sent = []
+        self.hung = []
+        self.hanging = asyncio.Event()
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.hang_after is not None and len(self.sent) >= self.hang_after:
+            self.hung.append(chat_id)
+            self.hanging.set()
+            await asyncio.Event().wait()
+        if chat_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        self.sent.append(chat_id)
+
+
+def add_users(count):
+    for user_id in range(1, count + 1):
+        save_user({
+            'user_id': user_id, 'username': f"user{user_id}", 'first_name': "Test", 'last_name': None,
+            'language_code': 'ru', 'is_bot': False, 'chat_id': user_id, 'chat_type': 'private',
+        })
+
+
+def fast_throttler():
+    """a throttler whose limits never make a test wait"""
+    return OutboundThrottler(global_rate=10000, global_burst=10000, chat_rate=10000, chat_burst=10)
+
+
+def test_broadcast_reaches_every_user_and_counts_blocked(tenant):
+    add_users(USERS)
+    broadcast_id = create_broadcast("hello", 'HTML', created_by=1)
+    bot = FakeBot(blocked=BLOCKED_USERS)
+
+    result = asyncio.run(run_broadcast(bot, broadcast_id, throttler=fast_throttler(), concurrency=4, batch_size=7))
+
+    assert result['status'] == 'done'
+    assert sorted(bot.sent) == [user_id for user_id in range(1, USERS + 1) if user_id not in BLOCKED_USERS]
+    assert result['sent'] == USERS - len(BLOCKED_USERS)
+    assert result['blocked'] == len(BLOCKED_USERS)
+    assert result['failed'] == 0
+
+
+def test_interrupted_broadcast_resumes_without_sending_twice(tenant):
+    add_users(USERS)
+    broadcast_id = create_broadcast("hello", 'HTML', created_by=1)
+    first_bot = FakeBot(blocked=BLOCKED_USERS, hang_after=10)
+
+    async def interrupt():
+        task = asyncio.ensure_future(
+            run_broadcast(first_bot, broadcast_id, throttler=fast_throttler(), concurrency=2, batch_size=8)
+        )
+        await first_bot.hanging.wait()
+        # let the other slot reach the api as well, the rest of the batch waits for a slot
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(interrupt())
+
+    # only the sends that were in flight are unconfirmed, the rest of the batch was released
+    interrupted = get_broadcast(broadcast_id)
+    assert interrupted['status'] == 'running'
+    assert interrupted['sent'] == len(first_bot.sent) == 10
+    unconfirmed = interrupted['claimed'] - interrupted['sent'] - interrupted['blocked'] - interrupted['failed']
+    assert unconfirmed == len(first_bot.hung) > 0
+
+    second_bot = FakeBot(blocked=BLOCKED_USERS)
+    result = asyncio.run(
+        run_broadcast(second_bot, broadcast_id, throttler=fast_throttler(), concurrency=2, batch_size=8)
+    )
+
+    # nobody got the message twice, and everyone whose send never started got it on resume
+    assert result['status'] == 'done'
+    assert not set(first_bot.sent) & set(second_bot.sent)
+    reached = set(first_bot.sent) | set(second_bot.sent) | BLOCKED_USERS
+    assert reached == set(range(1, USERS + 1)) - set(first_bot.hung)
+    assert result['claimed'] == USERS
+    assert result['sent'] + result['blocked'] + len(first_bot.hung) == USERS
+
+
+def test_archived_users_still_get_broadcasts(tenant):
+    add_users(USERS)
+    # every user was synced and last seen long ago, so retention archives them all
+    conn = get_db_connection()
+    conn.execute("UPDATE users SET synced = 1, last_seen = '2000-01-01 00:00:00'")
+    conn.commit()
+    conn.close()
+    assert archive_table('users', 30) == USERS
+
+    broadcast_id = create_broadcast("hello", 'HTML', created_by=1)
+    bot = FakeBot()
+    result = asyncio.run(run_broadcast(bot, broadcast_id, throttler=fast_throttler(), concurrency=4, batch_size=7))
+
+    assert result['status'] == 'done'
+    assert sorted(bot.sent) == list(range(1, USERS + 1))
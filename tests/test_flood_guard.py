@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+import flood_guard
+from bot import guard_update
+from flood_guard import InboundGuard
+from tenants import bind
+from update_processor import ChatOrderedUpdateProcessor
+
+TAPS = 5
+HANDLER_SECONDS = 0.3
+DUPLICATE_WINDOW = 0.2  # shorter than the handler, as 1.5 s is shorter than the 2 s pause after a rating
+
+
+class FakeBot:
+    """answers callback queries and counts them"""
+
+    token = None
+
+    def __init__(self):
+        self.answered = 0
+
+    async def answer_callback_query(self, callback_query_id, text=None, **kwargs):
+        self.answered += 1
+
+
+def callback_update(bot, data, user_id=1):
+    query = SimpleNamespace(id=str(user_id), data=data, get_bot=lambda: bot)
+    user = SimpleNamespace(id=user_id)
+    return SimpleNamespace(effective_user=user, effective_chat=SimpleNamespace(id=user_id),
+                           callback_query=query, message=None)
+
+
+def test_repeated_taps_behind_a_slow_handler_are_dropped(tenant, monkeypatch):
+    monkeypatch.setattr(flood_guard, 'inbound_guard', InboundGuard(duplicate_window=DUPLICATE_WINDOW))
+    bot = FakeBot()
+    handled = []
+
+    async def slow_handler(update):
+        handled.append(update.callback_query.data)
+        await asyncio.sleep(HANDLER_SECONDS)
+
+    async def tap():
+        processor = ChatOrderedUpdateProcessor(4, admit=bind(tenant, guard_update))
+        tasks = []
+        for _ in range(TAPS):
+            update = callback_update(bot, "rate_up_Cat_0")
+            tasks.append(asyncio.ensure_future(processor.process_update(update, slow_handler(update))))
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+        return processor
+
+    processor = asyncio.run(tap())
+
+    # the taps queue behind the first one for longer than the window, yet only it runs
+    assert handled == ["rate_up_Cat_0"]
+    assert processor.get_stats()['rejected'] == TAPS - 1
+    assert flood_guard.inbound_guard.get_stats()['duplicates'] == TAPS - 1
+    assert bot.answered == TAPS - 1
@@ -0,0 +1,100 @@
+import json
+import sqlite3
+import sinks
+from sinks import Sink, FileSink, SQLSink, write_to_sinks
+from database import get_sink_progress
+
+
+def user(user_id, username, last_seen="2026-10-01 12:00:00"):
+    return {
+        'user_id': user_id, 'username': username, 'first_name': "Test", 'last_name': None,
+        'language_code': 'ru', 'is_bot': 0, 'chat_id': user_id, 'chat_type': 'private',
+        'first_seen': "2026-10-01 12:00:00", 'last_seen': last_seen, 'synced': 0,
+    }
+
+
+def rating(user_id, article_id, value, timestamp="2026-10-01 12:00:00"):
+    return {
+        'id': user_id * 100 + int(article_id), 'user_id': user_id, 'username': f"user{user_id}",
+        'category': "Оплата", 'article_id': article_id, 'article_title': f"Статья {article_id}",
+        'rating': value, 'timestamp': timestamp, 'synced': 0,
+    }
+
+
+class FailingSink(Sink):
+    """a sink that is down until told otherwise"""
+
+    name = 'failing'
+
+    def __init__(self):
+        self.down = True
+        self.batches = []
+
+    def _write(self, rows):
+        if self.down:
+            raise RuntimeError("sink unavailable")
+        self.batches.append(rows)
+
+    def write_users(self, users):
+        self._write(users)
+
+    def write_ratings(self, ratings):
+        self._write(ratings)
+
+    def write_summary(self, stats):
+        self._write(stats)
+
+
+def test_sql_sink_upserts_by_key(tmp_path):
+    database = str(tmp_path / 'mirror.db')
+    sink = SQLSink(database)
+
+    sink.write_users([user(1, 'old'), user(2, 'second')])
+    sink.write_users([user(1, 'new', last_seen="2026-10-02 12:00:00")])
+    sink.write_ratings([rating(1, '0', "👍 Полезно"), rating(2, '0', "👍 Полезно")])
+    sink.write_ratings([rating(1, '0', "👎 Не полезно", timestamp="2026-10-02 12:00:00")])
+    stat = {'category': "Оплата", 'article_id': '0', 'article_title': "Статья 0",
+            'up_count': 2, 'down_count': 0, 'updated_at': "2026-10-01 12:00:00"}
+    sink.write_summary([stat])
+    sink.write_summary([dict(stat, up_count=1, down_count=1)])
+
+    conn = sqlite3.connect(database)
+    try:
+        users = conn.execute('SELECT user_id, username, first_seen, last_seen FROM users ORDER BY user_id').fetchall()
+        ratings = conn.execute('SELECT user_id, rating FROM ratings ORDER BY user_id').fetchall()
+        summary = conn.execute('SELECT up_count, down_count FROM article_summary').fetchall()
+    finally:
+        conn.close()
+
+    # updates replace the row, first seen stays from the insert
+    assert users == [
+        (1, 'new', "2026-10-01 12:00:00", "2026-10-02 12:00:00"),
+        (2, 'second', "2026-10-01 12:00:00", "2026-10-01 12:00:00"),
+    ]
+    assert ratings == [(1, "👎 Не полезно"), (2, "👍 Полезно")]
+    assert summary == [(1, 1)]
+
+
+def test_failed_sink_is_retried_alone(tenant, tmp_path):
+    failing = FailingSink()
+    files = FileSink(str(tmp_path / 'sync'), 'jsonl')
+    sinks.sinks[tenant.name] = [failing, files]
+    try:
+        batch = [user(1, 'first'), user(2, 'second')]
+        assert not write_to_sinks('users', batch)
+
+        # the file sink only gets the row that is new to it, twice failing changes nothing
+        batch.append(user(3, 'third'))
+        assert not write_to_sinks('users', batch)
+        assert not write_to_sinks('users', batch)
+
+        failing.down = False
+        assert write_to_sinks('users', batch)
+        assert get_sink_progress(files.name, 'users') == set()
+    finally:
+        del sinks.sinks[tenant.name]
+
+    with open(tmp_path / 'sync' / 'users.jsonl', encoding='utf-8') as f:
+        written = [json.loads(line)['user_id'] for line in f]
+    assert written == [1, 2, 3]
+    assert failing.batches == [batch]
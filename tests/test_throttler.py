@@ -0,0 +1,46 @@
+import asyncio
+from types import SimpleNamespace
+from throttler import OutboundThrottler
+from update_processor import ChatOrderedUpdateProcessor
+
+TAPS = 4
+CHAT_RATE = 5  # edits per second in one chat
+
+
+class FakeBot:
+    """records the text of every edit that reaches the api"""
+
+    token = 'fake'
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        self.edits.append(text)
+
+
+def test_rapid_edits_of_one_message_are_coalesced():
+    bot = FakeBot()
+    throttler = OutboundThrottler(global_rate=1000, global_burst=1000, chat_rate=CHAT_RATE, chat_burst=1)
+    message = SimpleNamespace(chat_id=1, message_id=10)
+
+    async def handler(text):
+        query = SimpleNamespace(message=message, get_bot=lambda: bot)
+        await throttler.edit(query, text)
+
+    async def tap():
+        processor = ChatOrderedUpdateProcessor(4)
+        updates = []
+        for i in range(1, TAPS + 1):
+            update = SimpleNamespace(effective_chat=SimpleNamespace(id=1), effective_user=SimpleNamespace(id=1))
+            updates.append(asyncio.ensure_future(processor.process_update(update, handler(f"state {i}"))))
+            await asyncio.sleep(0.02)
+        await asyncio.gather(*updates)
+        # let the queued edits go out
+        await asyncio.sleep(2 / CHAT_RATE)
+
+    asyncio.run(tap())
+
+    # the first edit goes out at once, the ones queued behind it collapse into the last state
+    assert bot.edits == ["state 1", f"state {TAPS}"]
+    assert throttler.get_stats()['coalesced'] == TAPS - 2
@@ -0,0 +1,222 @@
+import time
+import asyncio
+import logging
+from datetime import timedelta
+from telegram.error import RetryAfter, BadRequest
+from config import TG_GLOBAL_RATE, TG_GLOBAL_BURST, TG_CHAT_RATE, TG_CHAT_BURST, TG_MAX_RETRIES
+
+logger = logging.getLogger(__name__)
+
+PRUNE_EVERY = 1000  # drop idle per-chat state every N scheduled requests
+
+
+class OutboundThrottler:
+    """
+    schedule outgoing telegram requests within global and per-chat limits
+
+    limits are enforced with a GCRA (virtual scheduling) per bucket, so a short
+    burst goes out immediately and sustained traffic is spaced evenly. one
+    throttler serves every bot in the process, buckets are kept per bot token.
+    pending edits of the same message are coalesced: while an edit waits for
+    its slot, newer edits only replace its payload and share its result.
+    """
+
+    def __init__(self, global_rate=TG_GLOBAL_RATE, global_burst=TG_GLOBAL_BURST,
+                 chat_rate=TG_CHAT_RATE, chat_burst=TG_CHAT_BURST, max_retries=TG_MAX_RETRIES):
+        self.global_interval = 1.0 / global_rate
+        self.global_tolerance = self.global_interval * (global_burst - 1)
+        self.chat_interval = 1.0 / chat_rate
+        self.chat_tolerance = self.chat_interval * (chat_burst - 1)
+        self.max_retries = max_retries
+
+        self._global_tat = {}  # bot -> theoretical arrival time of the next request
+        self._chat_tat = {}  # (bot, chat) -> same, per chat
+        self._pending_edits = {}
+        self._edit_tasks = set()  # queued edits being delivered, kept referenced while running
+        self._scheduled = 0
+
+        # process-wide totals for /stats
+        self.sent = 0
+        self.coalesced = 0
+        self.retries = 0
+
+    def _reserve(self, bot_key, chat_id=None):
+        """reserve a send slot and return how long to wait for it"""
+        now = time.monotonic()
+        global_tat = self._global_tat.get(bot_key, now)
+        start = max(now, global_tat - self.global_tolerance)
+
+        if chat_id is not None:
+            chat_key = (bot_key, chat_id)
+            chat_tat = self._chat_tat.get(chat_key, now)
+            start = max(start, chat_tat - self.chat_tolerance)
+            self._chat_tat[chat_key] = max(chat_tat, start) + self.chat_interval
+
+        self._global_tat[bot_key] = max(global_tat, start) + self.global_interval
+
+        self._scheduled += 1
+        if self._scheduled % PRUNE_EVERY == 0:
+            self._prune(now)
+
+        return start - now
+
+    def _prune(self, now):
+        """forget chats whose slots are all in the past"""
+        self._chat_tat = {key: tat for key, tat in self._chat_tat.items() if tat > now}
+
+    def _pause(self, bot_key, seconds):
+        """push every bucket of the bot back after a flood-control response"""
+        resume_at = time.monotonic() + seconds
+        self._global_tat[bot_key] = max(self._global_tat.get(bot_key, 0.0), resume_at + self.global_tolerance)
+
+    async def _send(self, bot, bucket, method_name, reserved=False, **kwargs):
+        """wait for a slot of the bucket (chat id or None) and call the api method, retrying on RetryAfter"""
+        bot_key = get_bot_key(bot)
+        method = getattr(bot, method_name)
+
+        for attempt in range(self.max_retries + 1):
+            # a caller that already waited for its slot skips the first reservation
+            if attempt > 0 or not reserved:
+                delay = self._reserve(bot_key, bucket)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            try:
+                result = await method(**kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+
+                if attempt >= self.max_retries:
+                    raise
+
+                self.retries += 1
+                logger.warning("flood control hit, retrying in %ss (chat %s)", retry_after, bucket)
+                self._pause(bot_key, retry_after)
+
+    def queue_edit(self, bot, chat_id, message_id, text, **kwargs):
+        """
+        hand an edit to the slot of its message and return at once
+
+        while an edit waits for its send slot, newer edits of the same message
+        only replace its payload, so only the latest state goes out.
+
+        returns:
+            a future with the result of the edit that carries this payload
+        """
+        key = (get_bot_key(bot), chat_id, message_id)
+        payload = dict(chat_id=chat_id, message_id=message_id, text=text, **kwargs)
+
+        pending = self._pending_edits.get(key)
+        if pending is not None:
+            # an edit is still waiting for its slot, only the latest state matters
+            pending['payload'] = payload
+            self.coalesced += 1
+            return pending['future']
+
+        loop = asyncio.get_running_loop()
+        entry = {'payload': payload, 'future': loop.create_future()}
+        self._pending_edits[key] = entry
+
+        task = loop.create_task(self._deliver_edit(bot, key, entry))
+        self._edit_tasks.add(task)
+        task.add_done_callback(self._edit_tasks.discard)
+        return entry['future']
+
+    async def _deliver_edit(self, bot, key, entry):
+        """wait for the send slot of a queued edit and send its latest payload"""
+        future = entry['future']
+        try:
+            delay = self._reserve(key[0], key[1])
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            # from here on newer edits start their own entry
+            self._pending_edits.pop(key, None)
+            future.set_result(await self._send_edit(bot, key[1], entry['payload']))
+        except Exception as e:
+            logger.warning("failed to edit message %s in chat %s: %s", key[2], key[1], e)
+            future.set_exception(e)
+            # mark as retrieved, fire-and-forget callers never look at it
+            future.exception()
+        finally:
+            if self._pending_edits.get(key) is entry:
+                del self._pending_edits[key]
+            if not future.done():
+                future.cancel()
+
+    async def edit_message_text(self, bot, chat_id, message_id, text, **kwargs):
+        """edit a message and wait for the edit, or the newer one replacing it, to be sent"""
+        return await asyncio.shield(self.queue_edit(bot, chat_id, message_id, text, **kwargs))
+
+    async def _send_edit(self, bot, chat_id, payload):
+        """send an edit, treating 'message is not modified' as success"""
+        try:
+            return await self._send(bot, chat_id, 'edit_message_text', reserved=True, **payload)
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                return None
+            raise
+
+    async def send_message(self, bot, chat_id, text, **kwargs):
+        """send a new message to a chat"""
+        return await self._send(bot, chat_id, 'send_message', chat_id=chat_id, text=text, **kwargs)
+
+    async def send_document(self, bot, chat_id, document, **kwargs):
+        """send a file to a chat"""
+        return await self._send(bot, chat_id, 'send_document', chat_id=chat_id, document=document, **kwargs)
+
+    async def answer_callback_query(self, bot, callback_query_id, text=None, **kwargs):
+        """answer a callback query, these only count towards the global limit"""
+        return await self._send(bot, None, 'answer_callback_query',
+                                callback_query_id=callback_query_id, text=text, **kwargs)
+
+    # shortcuts mirroring the telegram objects used in handlers
+    async def edit(self, query, text, **kwargs):
+        """
+        edit the message a callback query came from without waiting for delivery
+
+        the handler returns right away, so the chat's next update can replace
+        the edit while it still waits for its slot; failures are logged.
+        """
+        message = query.message
+        self.queue_edit(query.get_bot(), message.chat_id, message.message_id, text, **kwargs)
+
+    async def reply(self, message, text, **kwargs):
+        """reply in the chat of the given message"""
+        return await self.send_message(message.get_bot(), message.chat_id, text, **kwargs)
+
+    async def answer(self, query, text=None, **kwargs):
+        """answer a callback query"""
+        return await self.answer_callback_query(query.get_bot(), query.id, text, **kwargs)
+
+    def get_stats(self):
+        """get counters for monitoring"""
+        return {
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'retries': self.retries,
+            'pending_edits': len(self._pending_edits),
+            'tracked_chats': len(self._chat_tat),
+        }
+
+
+def get_bot_key(bot):
+    """bucket key of a bot, its token; fake bots without one share a bucket"""
+    return getattr(bot, 'token', None)
+
+
+# shared throttler for all handlers and tenants
+throttler = None
+
+
+def get_throttler():
+    """Get the shared outbound throttler"""
+    global throttler
+
+    if throttler is None:
+        throttler = OutboundThrottler()
+    return throttler
@@ -0,0 +1,104 @@
+import sys
+import asyncio
+from contextlib import nullcontext
+from telegram.ext import BaseUpdateProcessor
+
+# limit handed to the base class, whose slot is taken before do_process_update;
+# it never binds, the slots of ChatOrderedUpdateProcessor do the limiting
+UNBOUNDED = sys.maxsize
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    process updates of different chats concurrently, updates of one chat in order
+
+    every update first waits for the lock of its chat, in arrival order, and
+    only then for one of the max_slots slots. an update queued behind a slow
+    handler of its own chat therefore never holds a slot that another chat
+    could use. updates without a chat are keyed by user, and ones with
+    neither only wait for a slot.
+
+    admit, if given, is an async check called as soon as an update arrives,
+    before any waiting; updates it rejects are dropped without running the
+    handlers, so repeated taps queued behind a slow handler are judged by
+    when they were sent rather than by when their turn comes.
+    """
+
+    def __init__(self, max_concurrent_updates, admit=None):
+        super().__init__(UNBOUNDED)
+        self.max_slots = max_concurrent_updates
+        self.admit = admit
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._chats = {}  # chat key -> [lock, updates holding or waiting for it]
+
+        # counters for monitoring
+        self.queued = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _chat_key(update):
+        chat = getattr(update, 'effective_chat', None)
+        if chat is not None:
+            return chat.id
+        user = getattr(update, 'effective_user', None)
+        if user is not None:
+            return ('user', user.id)
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        """check admission, wait for the chat lock, then for a slot, then run the handlers"""
+        if self.admit is not None and not await self.admit(update):
+            coroutine.close()
+            self.rejected += 1
+            return
+
+        key = self._chat_key(update)
+
+        entry = None
+        if key is not None:
+            entry = self._chats.get(key)
+            if entry is None:
+                entry = self._chats[key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+
+        self.queued += 1
+        started = False
+        try:
+            # asyncio locks wake waiters first in, first out
+            async with entry[0] if entry else nullcontext():
+                async with self._slots:
+                    self.queued -= 1
+                    started = True
+                    self.in_flight += 1
+                    try:
+                        await coroutine
+                    finally:
+                        self.in_flight -= 1
+                        self.processed += 1
+        finally:
+            if not started:
+                # cancelled while waiting, e.g. on shutdown
+                self.queued -= 1
+                coroutine.close()
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._chats[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def get_stats(self):
+        """get counters for monitoring"""
+        return {
+            'queued': self.queued,
+            'in_flight': self.in_flight,
+            'processed': self.processed,
+            'rejected': self.rejected,
+            'active_chats': len(self._chats),
+        }
@@ -1,16 +1,7 @@
 import logging
-from datetime import datetime
 from telegram import Update
-import time
 from database import save_user
-from google_client import get_sheets_client
-from dotenv import load_dotenv
-load_dotenv()
-# setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,9 +32,9 @@ def log_user(update: Update):
         success = save_user(user_data)
 
         if success:
-            logger.info(f"Logged user: {user.id} ({user.username or user.first_name})")
+            logger.info("Logged user: %s (%s)", user.id, user.username or user.first_name)
         else:
-            logger.error(f"Failed to log user {user.id}")
+            logger.error("Failed to log user %s", user.id)
 
     except Exception as e:
-        logger.error(f"Error logging user data: {e}")
\ No newline at end of file
+        logger.error("Error logging user data: %s", e)
\ No newline at end of file